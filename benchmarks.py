@@ -0,0 +1,309 @@
+"""Benchmarks for the task, budget and note models on synthetic data.
+
+Usage: python benchmarks.py [--sizes 1000 10000 100000 1000000] [--output results.jsonl]
+
+Each result is one JSON object per line with the app, operation, dataset size
+and mean seconds per call, so runs can be diffed to spot regressions. Data is
+generated from a fixed seed and written to a temporary directory.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from budget_model import BudgetModel, expense_row
+from chart_layout import burn_down, spend_over_time, top_names
+from expense_store import format_day
+from export import EXPENSE_FIELDS, NOTE_FIELDS, TASK_FIELDS, export, expense_records, note_records, task_records
+from money import AmountFormatter
+from note_model import NoteModel
+from persistence import PersistenceWorker
+from recurrence import FREQUENCIES, Rule
+from schema import BUDGET, TASKS, migrate_file, with_header
+from snapshot import convert
+from task_model import TaskModel, new_task, padded_task_row, read_records, task_row
+from task_store import TaskStore, task_to_json
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Mutations timed per dataset size; the mean per call is reported
+OPERATIONS = 100
+
+# Rows the v2 task list shows at once
+VISIBLE_ROWS = 8
+
+# Processes sharing one tasks file in the "shared" benchmark, and edits each makes
+SHARED_PROCESSES = 4
+SHARED_OPERATIONS = 20
+
+# Rows picked for the bulk (multi-select) operations
+BULK_SIZE = 1000
+
+WORDS = ("buy", "call", "email", "review", "plan", "pay", "fix", "clean", "read", "write",
+         "groceries", "report", "rent", "dentist", "garden", "invoice", "meeting", "car")
+
+def random_text(rng, words=4):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def random_date(rng):
+    return date(2024, 1, 1) + timedelta(days=rng.randrange(730))
+
+def typed_date(rng):
+    # A due date the way the v1 apps stored it, e.g. "3/7/24"
+    day = random_date(rng)
+    return f"{day.month}/{day.day}/{day.year % 100:02d}"
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def retained_bytes(function):
+    # Memory still allocated by whatever function() returns, plus its run time
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, allocated
+
+def read_json(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+def load_model(model):
+    model.load()
+    return model
+
+class Recorder:
+    def __init__(self, output):
+        self.output = output
+        self.meta = {"python": platform.python_version(), "platform": platform.platform(), "timestamp": time.time()}
+
+    def record(self, app, operation, size, seconds, bytes=None):
+        result = {"app": app, "operation": operation, "size": size, "seconds": seconds, **self.meta}
+        line = f"{app:<8} {operation:<16} {size:>9} {seconds * 1000:>12.3f} ms"
+        if bytes is not None:
+            result["bytes"] = bytes
+            line += f" {bytes / 1048576:>10.1f} MiB"
+        print(line, file=sys.stderr)
+        self.output.write(json.dumps(result) + "\n")
+        self.output.flush()
+
+def bench_tasks(recorder, size, directory, rng):
+    path = os.path.join(directory, "tasks.json")
+    tasks = [new_task(random_text(rng), random_date(rng).strftime("%m/%d/%Y")) for _ in range(size)]
+    with open(path, "w") as file:
+        json.dump(with_header(TASKS, {"tasks": tasks}), file, default=task_to_json)
+
+    recorder.record("tasks", "sort", size, timed(lambda: TaskStore(tasks)))
+
+    # A version 1 file as the v1 app left it: no header, no ids, due dates as typed
+    legacy_path = os.path.join(directory, "tasks_v1.json")
+    with open(legacy_path, "w") as file:
+        json.dump([{"task": task.task, "due_date": typed_date(rng), "completed": False} for task in tasks], file)
+    recorder.record("tasks", "migrate", size, timed(lambda: migrate_file(legacy_path, TASKS)))
+
+    # Resident size of the loaded list as plain dicts (the old format) and as records
+    recorder.record("tasks", "memory_dicts", size, *retained_bytes(lambda: read_json(path)))
+    recorder.record("tasks", "memory", size, *retained_bytes(lambda: load_model(TaskModel(path))))
+
+    model = TaskModel(path)
+    recorder.record("tasks", "load", size, timed(model.load))
+    recorder.record("tasks", "save", size, timed(model.save))
+
+    # Same data as a binary snapshot
+    binary_path = os.path.join(directory, "tasks.bin")
+    with open(binary_path, "w") as file:
+        json.dump(tasks, file, default=task_to_json)
+    convert(binary_path, "binary")
+    binary_model = TaskModel(binary_path)
+    recorder.record("tasks", "load_binary", size, timed(binary_model.load))
+    recorder.record("tasks", "save_binary", size, timed(binary_model.save))
+
+    recorder.record("tasks", "render_v1", size, timed(lambda: model.rows(formatter=padded_task_row)))
+    recorder.record("tasks", "render_v2", size, timed(lambda: model.rows(0, VISIBLE_ROWS, task_row), OPERATIONS))
+    # One keystroke each, up to the first screen of rows: a broad single letter, a word prefix, two words
+    for operation, query in (("filter_letter", "r"), ("filter_prefix", "rev"), ("filter_words", "pay rent")):
+        recorder.record("tasks", operation, size, timed(lambda: model.filter(query)[:VISIBLE_ROWS], OPERATIONS))
+    export_path = os.path.join(directory, "tasks_export.csv")
+    recorder.record("tasks", "export_csv", size, timed(lambda: export(export_path, TASK_FIELDS, task_records(model.tasks.to_list()), "Tasks")))
+
+    # UI-thread cost of mutations; the writes themselves happen on the worker
+    persistence = PersistenceWorker()
+    model.persistence = persistence
+    adds = [(random_text(rng), random_date(rng).strftime("%m/%d/%Y")) for _ in range(OPERATIONS)]
+    recorder.record("tasks", "add", size, timed(lambda: model.add_task(*adds.pop()), OPERATIONS))
+    recorder.record("tasks", "complete", size, timed(lambda: model.set_completed(rng.randrange(len(model)), True), OPERATIONS))
+    recorder.record("tasks", "delete", size, timed(lambda: model.delete_task(rng.randrange(len(model))), OPERATIONS))
+    bulk = rng.sample(range(len(model)), min(BULK_SIZE, len(model)))
+    recorder.record("tasks", "complete_bulk", size, timed(lambda: model.set_completed_many(bulk, True)))
+    recorder.record("tasks", "delete_bulk", size, timed(lambda: model.delete_tasks(bulk)))
+    recorder.record("tasks", "clear", size, timed(model.clear))
+    recorder.record("tasks", "undo", size, timed(model.undo, OPERATIONS))
+    recorder.record("tasks", "redo", size, timed(model.redo, OPERATIONS))
+    persistence.close()
+
+def hammer_tasks(path, seed):
+    # One app instance in the shared benchmark; every edit is written straight away
+    rng = random.Random(seed)
+    model = TaskModel(path)
+    model.load()
+    for _ in range(SHARED_OPERATIONS):
+        model.reload_changes()
+        model.add_task(random_text(rng), random_date(rng).strftime("%m/%d/%Y"))
+        model.set_completed(rng.randrange(len(model)), True)
+
+def bench_shared_tasks(recorder, size, directory, rng):
+    path = os.path.join(directory, "tasks.json")
+    tasks = [new_task(random_text(rng), random_date(rng).strftime("%m/%d/%Y")) for _ in range(size)]
+    with open(path, "w") as file:
+        json.dump(tasks, file, default=task_to_json)
+    TaskModel(path).load()
+
+    processes = [multiprocessing.Process(target=hammer_tasks, args=(path, rng.random()))
+                 for _ in range(SHARED_PROCESSES)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    seconds = time.perf_counter() - start
+
+    # Every add from every process has to survive the merges
+    expected = size + SHARED_PROCESSES * SHARED_OPERATIONS
+    found = len(read_records(path))
+    if found != expected:
+        raise RuntimeError(f"shared tasks file has {found} tasks, expected {expected}")
+    recorder.record("shared", "edit", size, seconds / (SHARED_PROCESSES * SHARED_OPERATIONS * 2))
+
+def bench_budget(recorder, size, directory, rng):
+    save_path = os.path.join(directory, "budget_data.json")
+    journal_path = os.path.join(directory, "budget_data.journal")
+    expenses = [[random_text(rng, 2), round(rng.uniform(1, 500), 2), format_day(random_date(rng).toordinal())] for _ in range(size)]
+    with open(save_path, "w") as file:
+        json.dump(with_header(BUDGET, {"budget": 1000000, "expenses": expenses, "seq": 0}), file)
+
+    legacy_path = os.path.join(directory, "budget_v1.json")
+    with open(legacy_path, "w") as file:
+        json.dump({"budget": 1000000, "expenses": [[name, str(amount), typed_date(rng)] for name, amount, day in expenses]}, file)
+    recorder.record("budget", "migrate", size, timed(lambda: migrate_file(legacy_path, BUDGET)))
+
+    recorder.record("budget", "memory_lists", size, *retained_bytes(lambda: read_json(save_path)["expenses"]))
+    recorder.record("budget", "memory", size, *retained_bytes(lambda: load_model(BudgetModel(save_path, journal_path))))
+
+    model = BudgetModel(save_path, journal_path)
+    recorder.record("budget", "load", size, timed(model.load))
+    recorder.record("budget", "save", size, timed(model.save))
+
+    binary_path = os.path.join(directory, "budget_data.bin")
+    with open(binary_path, "w") as file:
+        json.dump(with_header(BUDGET, {"budget": 1000000, "expenses": expenses, "seq": 0}), file)
+    convert(binary_path, "binary")
+    binary_model = BudgetModel(binary_path, binary_path + ".journal")
+    recorder.record("budget", "load_binary", size, timed(binary_model.load))
+    recorder.record("budget", "save_binary", size, timed(binary_model.save))
+
+    recorder.record("budget", "render", size, timed(lambda: [expense_row(expense) for expense in model.expenses]))
+    # The v1 relist: locale-formatted amounts, cached per value in cents
+    amounts = AmountFormatter()
+    amounts.refresh()
+    recorder.record("budget", "render_v1", size, timed(lambda: [f"{name} (${amounts.format(cents)})"
+                                                                for name, cents in model.expenses.cents_rows()]))
+    recorder.record("budget", "rollup_month", size, timed(model.expenses.totals_by_month))
+    recorder.record("budget", "rollup_name", size, timed(model.expenses.totals_by_name))
+    spending = model.spending
+    recorder.record("budget", "charts", size, timed(lambda: (spend_over_time(spending.month_dollars()), top_names(spending.name_dollars()),
+                                                             burn_down(spending.month_dollars(), model.budget))))
+    # Rules that have run for ten years; a month is expanded and the total counted cold
+    book = model.recurring
+    book.rules.extend(Rule(random_text(rng, 2), rng.choice(FREQUENCIES), random_date(rng).toordinal() - 3650,
+                           rng.randint(1, 3), amount_cents=rng.randrange(100, 100000)) for _ in range(max(1, size // 1000)))
+    month_start = date.today().replace(day=1).toordinal()
+    recorder.record("budget", "recurring_month", size, timed(lambda: (book.changed(), book.expand(month_start, month_start + 30)), OPERATIONS))
+    recorder.record("budget", "recurring_total", size, timed(lambda: (book.changed(), model.remaining_budget()), OPERATIONS))
+    export_path = os.path.join(directory, "expenses_export.jsonl")
+    recorder.record("budget", "export_jsonl", size, timed(lambda: export(export_path, EXPENSE_FIELDS, expense_records(model.expenses.columns_snapshot()), "Expenses")))
+
+    persistence = PersistenceWorker()
+    model.persistence = persistence
+    today = date.today().toordinal()
+    recorder.record("budget", "add", size, timed(lambda: model.add_expense("coffee", 3.5, today), OPERATIONS))
+    recorder.record("budget", "remaining", size, timed(model.remaining_budget, OPERATIONS))
+    recorder.record("budget", "delete", size, timed(lambda: model.remove_expense(rng.randrange(len(model.expenses))), OPERATIONS))
+    bulk = rng.sample(range(len(model.expenses)), min(BULK_SIZE, len(model.expenses)))
+    recorder.record("budget", "delete_bulk", size, timed(lambda: model.remove_expenses(bulk)))
+    recorder.record("budget", "undo", size, timed(model.undo, OPERATIONS))
+    recorder.record("budget", "redo", size, timed(model.redo, OPERATIONS))
+    model.close()
+    persistence.close()
+
+def bench_notes(recorder, size, directory, rng):
+    json_path = os.path.join(directory, "notes_data.json")
+    db_path = os.path.join(directory, "notes_data.db")
+    index_path = os.path.join(directory, "notes_index.json")
+    folder_count = max(1, size // 1000)
+    folders = [{"name": f"Folder {number}", "notes": []} for number in range(folder_count)]
+    for _ in range(size):
+        rng.choice(folders)["notes"].append(random_text(rng, 12))
+    with open(json_path, "w") as file:
+        json.dump({"note_folders": folders}, file)
+
+    model = NoteModel(db_path, json_path, index_path)
+    recorder.record("notes", "load", size, timed(model.load))
+    folder = model.folders[0]
+    recorder.record("notes", "open_folder", size, timed(lambda: model.load_folder_notes(folder)))
+    recorder.record("notes", "search", size, timed(lambda: model.search(random_text(rng, 2), 100), OPERATIONS))
+    export_path = os.path.join(directory, "notes_export.html")
+    recorder.record("notes", "export_html", size, timed(lambda: export(export_path, NOTE_FIELDS, note_records(db_path), "Notes")))
+
+    persistence = PersistenceWorker()
+    model.store.persistence = persistence
+    recorder.record("notes", "add", size, timed(lambda: model.add_note(folder, random_text(rng, 12)), OPERATIONS))
+    recorder.record("notes", "delete", size, timed(lambda: model.remove_note(folder, 0), OPERATIONS))
+    bulk = range(0, len(folder["note_ids"]), 2)
+    recorder.record("notes", "move_bulk", size, timed(lambda: model.move_notes(folder, bulk, model.folders[-1])))
+    # Copies share stored text, so the database should barely grow
+    copied = model.folders[-1]
+    model.load_folder_notes(copied)
+    recorder.record("notes", "copy_bulk", size, timed(lambda: model.copy_notes(copied, range(len(copied["note_ids"])), folder)))
+    recorder.record("notes", "delete_bulk", size, timed(lambda: model.remove_notes(folder, range(len(folder["note_ids"])))))
+    recorder.record("notes", "undo", size, timed(model.undo, OPERATIONS))
+    recorder.record("notes", "redo", size, timed(model.redo, OPERATIONS))
+    closed = timed(model.close)
+    recorder.record("notes", "save_index", size, closed, os.path.getsize(db_path))
+    persistence.close()
+
+BENCHMARKS = {"tasks": bench_tasks, "budget": bench_budget, "notes": bench_notes, "shared": bench_shared_tasks}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--apps", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    recorder = Recorder(output)
+    try:
+        for size in args.sizes:
+            for app in args.apps:
+                with tempfile.TemporaryDirectory() as directory:
+                    BENCHMARKS[app](recorder, size, directory, random.Random(args.seed))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import json
+import os
+import threading
+from datetime import date
+from expense_store import ExpenseStore, format_day, parse_day
+from history import History
+from money import to_cents, to_dollars
+from persistence import write_json_atomic
+from recurrence import RecurrenceBook, rules_path
+from schema import BUDGET, migrate_file, with_header
+from snapshot import is_snapshot, read_budget, write_budget
+from spending import SpendingBuckets
+
+# Number of journal records after which the journal is folded into the snapshot
+COMPACT_EVERY = 1000
+
+def expense_row(expense):
+    return f"{expense[0]} (${expense[1]:.2f})"
+
+class BudgetModel:
+    """Budget and expense ledger, independent of tkinter.
+
+    With a save_path the ledger is persisted as a JSON snapshot plus an
+    append-only journal (journal_path) of sequenced mutations; load replays the
+    journal records newer than the snapshot. Without one it is in-memory only.
+    The snapshot may be JSON or binary (see snapshot.py) and is rewritten in the
+    format it was loaded in. Older JSON snapshots are migrated on load (see
+    schema.py).
+    Journal and snapshot writes run on the PersistenceWorker when one is given.
+
+    spending holds month and name totals that follow every edit, for charts.
+
+    recurring holds rules for repeating expenses (rent, subscriptions), kept in
+    their own file. Occurrences up to today count against the budget without
+    being stored as expenses.
+
+    Edits record their inverse in history. Undo and redo are journaled like any
+    other edit, except undoing a clear, which swaps the old ExpenseStore back in
+    and writes a snapshot.
+    """
+
+    def __init__(self, save_path=None, journal_path=None, persistence=None):
+        self.save_path = save_path
+        self.journal_path = journal_path
+        self.persistence = persistence
+
+        self.budget = 0
+        self.expenses = ExpenseStore()
+        self.seq = 0
+        self.journal_length = 0
+        self.journal_buffer = []
+        self.pending_snapshot = None
+        self.journal_lock = threading.Lock()
+        self.binary = False
+        self.history = History()
+        self.migrations = []
+        self.spending = SpendingBuckets()
+        self.recurring = RecurrenceBook(rules_path(save_path) if save_path else None, persistence)
+
+    def remaining_cents(self):
+        # Exact, since expenses are summed in whole cents
+        return to_cents(self.budget) - self.expenses.total_cents - self.recurring_cents()
+
+    def recurring_cents(self):
+        # Recurring expenses that have come due, from each rule's start through today
+        return self.recurring.total_cents(1, date.today().toordinal())
+
+    def remaining_budget(self):
+        return to_dollars(self.remaining_cents())
+
+    def load(self):
+        if self.save_path is None:
+            return
+        self.recurring.load()
+        migration = migrate_file(self.save_path, BUDGET)
+        if migration is not None:
+            self.migrations.append(migration)
+        self.binary = is_snapshot(self.save_path)
+        if self.binary:
+            self.budget, self.seq, self.expenses = read_budget(self.save_path)
+        else:
+            try:
+                with open(self.save_path, "r") as file:
+                    data = json.load(file)
+                    self.budget = data.get("budget", 0)
+                    self.expenses = ExpenseStore(data.get("expenses", []))
+                    self.seq = data.get("seq", 0)
+            except FileNotFoundError:
+                pass
+        self.replay_journal()
+        self.spending.rebuild(self.expenses)
+
+    def replay_journal(self):
+        torn = False
+        try:
+            with open(self.journal_path, "r") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line) if line.endswith("\n") else None
+                    except ValueError:
+                        record = None
+                    if record is None:
+                        # Partial record left behind by an interrupted write
+                        torn = True
+                        break
+                    # Records already folded into the snapshot are skipped
+                    if record["seq"] > self.seq:
+                        self.apply_record(record)
+                        self.seq = record["seq"]
+                    self.journal_length += 1
+        except FileNotFoundError:
+            pass
+
+        if torn:
+            self.save()
+
+    def apply_record(self, record):
+        op = record["op"]
+        if op == "add":
+            self.expenses.extend([record["expense"]])
+        elif op == "insert":
+            name, amount, day = record["expense"]
+            self.expenses.insert(record["index"], name, amount, parse_day(day))
+        elif op == "remove":
+            self.expenses.pop(record["index"])
+        elif op == "remove_many":
+            self.expenses.pop_many(record["indices"])
+        elif op == "insert_many":
+            self.expenses.insert_many(record["indices"], [(name, amount, parse_day(day)) for name, amount, day in record["expenses"]])
+        elif op == "clear":
+            self.expenses.clear()
+        elif op == "budget":
+            self.budget = record["budget"]
+
+    def set_budget(self, budget):
+        previous = self.budget
+        self.change_budget(budget)
+        self.history.record("set budget", lambda: self.change_budget(previous), lambda: self.change_budget(budget))
+
+    def add_expense(self, name, amount, day):
+        self.expenses.append(name, amount, day)
+        self.spending.add(name, amount, day)
+        self.record_change("add", expense=[name, amount, format_day(day)])
+        index = len(self.expenses) - 1
+        self.history.record("add expense", lambda: self.pop_expense(index),
+                            lambda: self.insert_expense(index, name, amount, day))
+
+    def remove_expense(self, index):
+        day = self.expenses.day(index)
+        expense = self.pop_expense(index)
+        name, amount = expense
+        self.history.record("remove expense", lambda: self.insert_expense(index, name, amount, day),
+                            lambda: self.pop_expense(index))
+        return expense
+
+    def remove_expenses(self, indices):
+        # A whole selection is one undo step and one journal record
+        indices = sorted(set(indices))
+        rows = self.pop_expenses(indices)
+        self.history.record("remove expenses", lambda: self.insert_expenses(indices, rows),
+                            lambda: self.pop_expenses(indices))
+        return rows
+
+    def clear_expenses(self):
+        # The cleared store is kept whole by the undo step rather than copied
+        cleared = self.empty_expenses()
+        self.history.record("clear expenses", lambda: self.restore_expenses(cleared), self.empty_expenses)
+
+    def import_expenses(self, names, amounts, days):
+        # Bulk rows are not journaled; call save() once the import is done.
+        # Steps recorded before the import no longer line up with the rows.
+        self.expenses.extend_columns(names, amounts, days)
+        self.spending.add_columns(names, amounts, days)
+        self.history.clear()
+
+    def undo(self):
+        # Returns the label of the undone step, or None
+        return self.history.undo()
+
+    def redo(self):
+        return self.history.redo()
+
+    def change_budget(self, budget):
+        self.budget = budget
+        self.record_change("budget", budget=budget)
+
+    def pop_expense(self, index):
+        day = self.expenses.day(index)
+        expense = self.expenses.pop(index)
+        self.spending.remove(*expense, day)
+        self.record_change("remove", index=index)
+        return expense
+
+    def insert_expense(self, index, name, amount, day):
+        self.expenses.insert(index, name, amount, day)
+        self.spending.add(name, amount, day)
+        self.record_change("insert", index=index, expense=[name, amount, format_day(day)])
+
+    def pop_expenses(self, indices):
+        rows = self.expenses.pop_many(indices)
+        for row in rows:
+            self.spending.remove(*row)
+        self.record_change("remove_many", indices=indices)
+        return rows
+
+    def insert_expenses(self, indices, rows):
+        self.expenses.insert_many(indices, rows)
+        for row in rows:
+            self.spending.add(*row)
+        self.record_change("insert_many", indices=indices,
+                           expenses=[[name, amount, format_day(day)] for name, amount, day in rows])
+
+    def empty_expenses(self):
+        cleared, self.expenses = self.expenses, ExpenseStore()
+        self.spending.clear()
+        self.record_change("clear")
+        return cleared
+
+    def restore_expenses(self, expenses):
+        # There is no journal record for this; the snapshot carries the rows
+        self.expenses = expenses
+        self.spending.rebuild(expenses)
+        self.seq += 1
+        self.save()
+
+    def record_change(self, op, **fields):
+        self.seq += 1
+        if self.save_path is None:
+            return
+        record = {"seq": self.seq, "op": op, **fields}
+        with self.journal_lock:
+            self.journal_buffer.append((self.seq, json.dumps(record) + "\n"))
+
+        self.journal_length += 1
+        if self.journal_length >= COMPACT_EVERY:
+            self.save()
+        else:
+            self.submit(self.write_changes)
+
+    def save(self):
+        # Folds the journal into a fresh snapshot
+        if self.save_path is None:
+            return
+        if self.binary:
+            # Column copies are cheap; the rows are only encoded on the worker
+            snapshot = {"budget": self.budget, "columns": self.expenses.columns_snapshot(), "seq": self.seq}
+        else:
+            snapshot = with_header(BUDGET, {"budget": self.budget, "expenses": self.expenses.to_list(), "seq": self.seq})
+        with self.journal_lock:
+            self.pending_snapshot = snapshot
+        self.journal_length = 0
+        self.submit(self.write_changes)
+
+    def submit(self, job):
+        if self.persistence is not None:
+            self.persistence.submit(self.journal_path, job)
+        else:
+            job()
+
+    def write_changes(self):
+        # Runs on the persistence worker; records are buffered by record_change
+        with self.journal_lock:
+            lines, self.journal_buffer = self.journal_buffer, []
+            snapshot, self.pending_snapshot = self.pending_snapshot, None
+
+        if snapshot is None:
+            with open(self.journal_path, "a") as file:
+                file.writelines(line for seq, line in lines)
+                file.flush()
+                os.fsync(file.fileno())
+            return
+
+        # The snapshot is swapped in first, so a crash leaves either the old or the
+        # new snapshot on disk. The journal is then replaced by the records newer
+        # than the snapshot; older records would be skipped on replay anyway.
+        if "columns" in snapshot:
+            write_budget(self.save_path, snapshot["budget"], snapshot["seq"], snapshot["columns"])
+        else:
+            write_json_atomic(self.save_path, snapshot)
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.writelines(line for seq, line in lines if seq > snapshot["seq"])
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def close(self):
+        if self.journal_length:
+            self.save()
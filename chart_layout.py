@@ -0,0 +1,85 @@
+import heapq
+
+CHART_WIDTH = 360
+CHART_HEIGHT = 150
+MARGIN = 24
+
+# Expense names shown in the top names chart
+TOP_NAMES = 6
+
+BAR_COLOR = '#2196F3'
+LINE_COLOR = '#F44336'
+
+# Charts are laid out as lists of canvas items, ("rect" | "line" | "text", coords, options),
+# which is the part that can run off the Tk thread, or without Tk at all (benchmarks).
+# charts.py draws them, one canvas call each.
+
+def month_label(month):
+    return f"{month[0]}-{month[1]:02d}" if month else "undated"
+
+def label_step(count, room):
+    # Draw every step-th label so they do not overlap
+    return max(1, -(-count // room))
+
+def spend_over_time(by_month, width=CHART_WIDTH, height=CHART_HEIGHT):
+    months = sorted(month for month in by_month if month)
+    if not months:
+        return [("text", (width / 2, height / 2), {"text": "No dated expenses yet"})]
+    peak = max(max(by_month[month] for month in months), 0.01)
+    slot = (width - 2 * MARGIN) / len(months)
+    step = label_step(len(months), 5)
+    items = []
+    for position, month in enumerate(months):
+        x0 = MARGIN + position * slot
+        bar_height = (height - 2 * MARGIN) * max(by_month[month], 0) / peak
+        items.append(("rect", (x0 + slot * 0.1, height - MARGIN - bar_height, x0 + slot * 0.9, height - MARGIN),
+                      {"fill": BAR_COLOR, "width": 0}))
+        if position % step == 0:
+            items.append(("text", (x0 + slot / 2, height - MARGIN / 2), {"text": month_label(month), "font": ("Helvetica", 8)}))
+    items.append(("text", (MARGIN, MARGIN / 2), {"text": f"peak ${peak:,.2f}", "anchor": "w", "font": ("Helvetica", 8)}))
+    return items
+
+def top_names(by_name, width=CHART_WIDTH, height=CHART_HEIGHT, limit=TOP_NAMES):
+    top = heapq.nlargest(limit, by_name.items(), key=lambda item: item[1])
+    if not top:
+        return [("text", (width / 2, height / 2), {"text": "No expenses yet"})]
+    peak = max(top[0][1], 0.01)
+    row = (height - MARGIN) / limit
+    label_width = width * 0.35
+    items = []
+    for position, (name, total) in enumerate(top):
+        y0 = MARGIN / 2 + position * row
+        bar_width = (width - label_width - MARGIN * 2) * max(total, 0) / peak
+        items.append(("text", (label_width - 4, y0 + row / 2), {"text": name[:18], "anchor": "e", "font": ("Helvetica", 9)}))
+        items.append(("rect", (label_width, y0 + row * 0.15, label_width + bar_width, y0 + row * 0.85),
+                      {"fill": BAR_COLOR, "width": 0}))
+        items.append(("text", (label_width + bar_width + 4, y0 + row / 2), {"text": f"${total:,.0f}", "anchor": "w", "font": ("Helvetica", 8)}))
+    return items
+
+def burn_down(by_month, budget, width=CHART_WIDTH, height=CHART_HEIGHT):
+    # Remaining budget after each month; undated spending counts from the start
+    months = sorted(month for month in by_month if month)
+    remaining = [budget - by_month.get(None, 0.0)]
+    for month in months:
+        remaining.append(remaining[-1] - by_month[month])
+    top = max(max(remaining), 0.01)
+    bottom = min(min(remaining), 0)
+    scale = (height - 2 * MARGIN) / (top - bottom)
+    slot = (width - 2 * MARGIN) / max(len(remaining) - 1, 1)
+
+    def y(value):
+        return height - MARGIN - (value - bottom) * scale
+
+    points = []
+    for position, value in enumerate(remaining):
+        points.extend((MARGIN + position * slot, y(value)))
+    if len(points) == 2:
+        points.extend((width - MARGIN, points[1]))
+    items = [("line", (MARGIN, y(0), width - MARGIN, y(0)), {"fill": '#BDBDBD', "dash": (2, 2)}),
+             ("line", tuple(points), {"fill": LINE_COLOR, "width": 2})]
+    step = label_step(len(months), 5)
+    for position, month in enumerate(months):
+        if position % step == 0:
+            items.append(("text", (MARGIN + (position + 1) * slot, height - MARGIN / 2), {"text": month_label(month), "font": ("Helvetica", 8)}))
+    items.append(("text", (MARGIN, MARGIN / 2), {"text": f"budget ${budget:,.2f}, left ${remaining[-1]:,.2f}", "anchor": "w", "font": ("Helvetica", 8)}))
+    return items
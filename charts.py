@@ -0,0 +1,107 @@
+import threading
+import tkinter as tk
+
+from chart_layout import CHART_HEIGHT, CHART_WIDTH, burn_down, spend_over_time, top_names
+
+# Milliseconds between checks on the background chart renderer
+RENDER_POLL_INTERVAL = 20
+
+def draw(canvas, items):
+    canvas.delete("all")
+    for kind, coords, options in items:
+        if kind == "rect":
+            canvas.create_rectangle(*coords, **options)
+        elif kind == "line":
+            canvas.create_line(*coords, **options)
+        else:
+            canvas.create_text(*coords, **options)
+
+class ChartsPanel:
+    """Window with spend over time, top expense names and budget burn-down.
+
+    Charts are built from the model's SpendingBuckets. Each one is cached with
+    the bucket version (and budget) it was built from, and only stale charts are
+    laid out again, on a background thread, when refresh() is called. The cache
+    dict is owned by the caller so it outlives the window.
+    """
+
+    CHARTS = (("Spending by month", "months"), ("Top expenses", "names"), ("Budget burn-down", "months"))
+
+    def __init__(self, root, model, cache):
+        self.root = root
+        self.model = model
+        self.cache = cache
+        self.drawn = {}
+        self.renderer = None
+        self.refresh_again = False
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Spending Charts")
+        self.window.configure(bg='white')
+        self.canvases = []
+        for title, bucket in self.CHARTS:
+            tk.Label(self.window, text=title, font=("Helvetica", 12, "bold"), bg='white').pack(anchor=tk.W, padx=10)
+            canvas = tk.Canvas(self.window, width=CHART_WIDTH, height=CHART_HEIGHT, bg='#EAEAEA', highlightthickness=0)
+            canvas.pack(padx=10, pady=(0, 10))
+            self.canvases.append(canvas)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def is_open(self):
+        return self.window is not None
+
+    def close(self):
+        self.window.destroy()
+        self.window = None
+
+    def chart_keys(self):
+        spending = self.model.spending
+        return [(bucket, spending.versions[bucket]) + ((self.model.budget,) if index == 2 else ())
+                for index, (title, bucket) in enumerate(self.CHARTS)]
+
+    def refresh(self):
+        if self.window is None:
+            return
+        if self.renderer is not None:
+            # A render is running; go again once it is done
+            self.refresh_again = True
+            return
+
+        keys = self.chart_keys()
+        stale = [index for index, key in enumerate(keys) if self.cache.get(index, (None,))[0] != key]
+        for index, key in enumerate(keys):
+            if index not in stale and self.drawn.get(index) != key:
+                draw(self.canvases[index], self.cache[index][1])
+                self.drawn[index] = key
+        if not stale:
+            return
+
+        # The background thread gets its own copies of the buckets
+        spending = self.model.spending
+        by_month = spending.month_dollars()
+        by_name = spending.name_dollars() if 1 in stale else {}
+        budget = self.model.budget
+        builders = {0: lambda: spend_over_time(by_month), 1: lambda: top_names(by_name), 2: lambda: burn_down(by_month, budget)}
+        results = {}
+
+        def render():
+            for index in stale:
+                results[index] = (keys[index], builders[index]())
+
+        self.renderer = threading.Thread(target=render, name="chart-renderer", daemon=True)
+        self.renderer.start()
+        self.root.after(RENDER_POLL_INTERVAL, lambda: self.poll_renderer(results))
+
+    def poll_renderer(self, results):
+        if self.renderer.is_alive():
+            self.root.after(RENDER_POLL_INTERVAL, lambda: self.poll_renderer(results))
+            return
+        self.renderer = None
+        self.cache.update(results)
+        if self.window is not None:
+            for index, (key, items) in results.items():
+                draw(self.canvases[index], items)
+                self.drawn[index] = key
+        if self.refresh_again:
+            self.refresh_again = False
+            self.refresh()
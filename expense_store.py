@@ -0,0 +1,316 @@
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import compress
+
+from money import CENTS, cents_column, to_cents, to_dollars
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Day column value for expenses saved before dates were recorded
+UNDATED = 0
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+@lru_cache(maxsize=4096)
+def parse_day(text):
+    try:
+        return datetime.strptime(text, DATE_FORMAT).date().toordinal()
+    except (TypeError, ValueError):
+        return UNDATED
+
+def format_day(day):
+    return date.fromordinal(day).strftime(DATE_FORMAT) if day != UNDATED else None
+
+class ExpenseStore:
+    """Column-oriented expense ledger with a running total.
+
+    Amounts are kept as integer cents, so the total and the rollups are exact
+    sums rather than accumulated float error. Cents, name codes and day
+    ordinals live in parallel NumPy arrays (or array.array columns when NumPy
+    is not installed). Names are interned into name_table so each row only
+    stores an integer code. Amounts go in and come out as dollars: indexing
+    returns (name, amount) so existing listbox code keeps working.
+    """
+
+    def __init__(self, expenses=()):
+        self.name_table = []
+        self.name_codes = {}
+        self.size = 0
+        self.total_cents = 0
+        if np is not None:
+            self.cents = np.zeros(16, dtype=np.int64)
+            self.codes = np.zeros(16, dtype=np.int64)
+            self.days = np.zeros(16, dtype=np.int64)
+        else:
+            self.cents = array("q")
+            self.codes = array("q")
+            self.days = array("q")
+        self.extend(expenses)
+
+    @classmethod
+    def from_columns(cls, name_table, codes, amounts, days):
+        # Adopts whole columns, e.g. from a binary snapshot, without touching rows one by one.
+        # amounts are in dollars, as columns_snapshot returns them.
+        store = cls()
+        store.name_table = list(name_table)
+        store.name_codes = {name: code for code, name in enumerate(store.name_table)}
+        if np is not None:
+            store.cents = cents_column(amounts)
+            store.codes = np.array(codes, dtype=np.int64)
+            store.days = np.array(days, dtype=np.int64)
+            store.total_cents = int(store.cents.sum())
+        else:
+            store.cents = array("q", cents_column(amounts))
+            store.codes = array("q", codes)
+            store.days = array("q", days)
+            store.total_cents = sum(store.cents)
+        store.size = len(store.cents)
+        return store
+
+    def columns_snapshot(self):
+        # Copies of (name_table, codes, amounts, days) that later edits will not touch;
+        # amounts are float dollars so snapshots and exports keep their format
+        if np is not None:
+            return (list(self.name_table), self.column("codes").copy(), self.column("cents") / CENTS,
+                    self.column("days").copy())
+        return (list(self.name_table), array("q", self.codes), array("d", (cents / CENTS for cents in self.cents)),
+                array("q", self.days))
+
+    @property
+    def total(self):
+        return to_dollars(self.total_cents)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("expense index out of range")
+        return (self.name_table[self.codes[index]], to_dollars(int(self.cents[index])))
+
+    def __iter__(self):
+        for name, cents in self.cents_rows():
+            yield (name, to_dollars(cents))
+
+    def cents_rows(self):
+        # (name, cents) for every row, read a column at a time rather than row by row
+        name_table = self.name_table
+        codes = self.column("codes")
+        cents = self.column("cents")
+        if np is not None:
+            codes = codes.tolist()
+            cents = cents.tolist()
+        return [(name_table[code], amount) for code, amount in zip(codes, cents)]
+
+    def name_code(self, name):
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.name_table)
+            self.name_table.append(name)
+        return code
+
+    def reserve(self, count):
+        if np is None or self.size + count <= len(self.cents):
+            return
+        capacity = max(len(self.cents) * 2, self.size + count)
+        for column in ("cents", "codes", "days"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def append(self, name, amount, day=UNDATED):
+        code = self.name_code(name)
+        cents = to_cents(amount)
+        if np is not None:
+            self.reserve(1)
+            self.cents[self.size] = cents
+            self.codes[self.size] = code
+            self.days[self.size] = day
+        else:
+            self.cents.append(cents)
+            self.codes.append(code)
+            self.days.append(day)
+        self.size += 1
+        self.total_cents += cents
+
+    def extend(self, expenses):
+        # Accepts (name, amount) pairs or saved [name, amount, "MM/DD/YYYY"] rows
+        names, amounts, days = [], [], []
+        for expense in expenses:
+            names.append(expense[0])
+            amounts.append(float(expense[1]))
+            days.append(parse_day(expense[2]) if len(expense) > 2 else UNDATED)
+        self.extend_columns(names, amounts, days)
+
+    def extend_columns(self, names, amounts, days):
+        # Bulk insert from parallel sequences; amounts (in dollars) and days may be NumPy arrays
+        if not len(names):
+            return
+
+        codes = [self.name_code(name) for name in names]
+        cents = cents_column(amounts)
+        if np is not None:
+            count = len(names)
+            self.reserve(count)
+            self.cents[self.size:self.size + count] = cents
+            self.codes[self.size:self.size + count] = codes
+            self.days[self.size:self.size + count] = days
+            self.size += count
+            self.total_cents += int(cents.sum())
+        else:
+            self.cents.extend(cents)
+            self.codes.extend(codes)
+            self.days.extend(days)
+            self.size += len(names)
+            self.total_cents += sum(cents)
+
+    def insert(self, index, name, amount, day=UNDATED):
+        # Puts a row back where it was removed from (undo)
+        code = self.name_code(name)
+        cents = to_cents(amount)
+        if np is not None:
+            self.reserve(1)
+            for column, value in ((self.cents, cents), (self.codes, code), (self.days, day)):
+                column[index + 1:self.size + 1] = column[index:self.size]
+                column[index] = value
+        else:
+            self.cents.insert(index, cents)
+            self.codes.insert(index, code)
+            self.days.insert(index, day)
+        self.size += 1
+        self.total_cents += cents
+
+    def pop(self, index):
+        expense = self[index]
+        if index < 0:
+            index += self.size
+        self.total_cents -= int(self.cents[index])
+        if np is not None:
+            for column in (self.cents, self.codes, self.days):
+                column[index:self.size - 1] = column[index + 1:self.size]
+        else:
+            for column in (self.cents, self.codes, self.days):
+                del column[index]
+        self.size -= 1
+        return expense
+
+    def pop_many(self, indices):
+        # Removes the rows at the given ascending indices in one pass; returns (name, amount, day) rows
+        rows = [self[index] + (self.day(index),) for index in indices]
+        self.total_cents -= sum(int(self.cents[index]) for index in indices)
+        if np is not None:
+            keep = np.ones(self.size, dtype=bool)
+            keep[list(indices)] = False
+            count = self.size - len(rows)
+            for column in (self.cents, self.codes, self.days):
+                column[:count] = column[:self.size][keep]
+        else:
+            keep = bytearray(b"\x01") * self.size
+            for index in indices:
+                keep[index] = 0
+            for name in ("cents", "codes", "days"):
+                setattr(self, name, array("q", compress(getattr(self, name), keep)))
+        self.size -= len(rows)
+        return rows
+
+    def insert_many(self, indices, rows):
+        # Puts (name, amount, day) rows back where pop_many took them from; indices ascending
+        cents = [to_cents(amount) for name, amount, day in rows]
+        if np is not None:
+            # np.insert positions refer to the array before any of the rows go in
+            positions = [index - count for count, index in enumerate(indices)]
+            for name, values in (("cents", cents),
+                                 ("codes", [self.name_code(name) for name, amount, day in rows]),
+                                 ("days", [day for name, amount, day in rows])):
+                setattr(self, name, np.insert(self.column(name), positions, values))
+        else:
+            for index, (name, amount, day), row_cents in zip(indices, rows, cents):
+                self.cents.insert(index, row_cents)
+                self.codes.insert(index, self.name_code(name))
+                self.days.insert(index, day)
+        self.size += len(rows)
+        self.total_cents += sum(cents)
+
+    def clear(self):
+        self.__init__()
+
+    def day(self, index):
+        return int(self.days[index])
+
+    def to_list(self):
+        rows = []
+        for index, (name, amount) in enumerate(self):
+            day = format_day(int(self.days[index]))
+            rows.append([name, amount, day] if day else [name, amount])
+        return rows
+
+    def column(self, name):
+        values = getattr(self, name)
+        return values[:self.size] if np is not None else values
+
+    # Rollups sum whole cents (exact below 2**53 cents, even as float64 weights);
+    # the totals_by_* forms convert to dollars at the end.
+
+    def totals_by_name(self):
+        return {name: to_dollars(cents) for name, cents in self.cents_by_name().items()}
+
+    def totals_by_day(self):
+        # Keys are date objects, or None for undated expenses
+        if np is not None:
+            days, inverse = np.unique(self.column("days"), return_inverse=True)
+            sums = np.bincount(inverse, weights=self.column("cents"))
+            return {(date.fromordinal(int(day)) if day != UNDATED else None): to_dollars(int(total))
+                    for day, total in zip(days, sums)}
+        totals = {}
+        for day, cents in zip(self.days, self.cents):
+            key = date.fromordinal(day) if day != UNDATED else None
+            totals[key] = totals.get(key, 0) + cents
+        return {key: to_dollars(cents) for key, cents in totals.items()}
+
+    def totals_by_month(self):
+        # Keys are (year, month) tuples, or None for undated expenses
+        return {month: to_dollars(cents) for month, cents in self.cents_by_month().items()}
+
+    def cents_by_name(self):
+        if np is not None:
+            codes = self.column("codes")
+            counts = np.bincount(codes, minlength=len(self.name_table))
+            sums = np.bincount(codes, weights=self.column("cents"), minlength=len(self.name_table))
+            return {self.name_table[code]: int(sums[code]) for code in np.flatnonzero(counts)}
+        totals = {}
+        for code, cents in zip(self.codes, self.cents):
+            name = self.name_table[code]
+            totals[name] = totals.get(name, 0) + cents
+        return totals
+
+    def cents_by_month(self):
+        if np is not None:
+            days = self.column("days")
+            cents = self.column("cents")
+            dated = days != UNDATED
+            totals = {}
+            if not dated.all():
+                totals[None] = int(cents[~dated].sum())
+            months = (days[dated] - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+            unique_months, inverse = np.unique(months, return_inverse=True)
+            sums = np.bincount(inverse, weights=cents[dated])
+            for month, total in zip(unique_months, sums):
+                totals[(1970 + int(month) // 12, int(month) % 12 + 1)] = int(total)
+            return totals
+        totals = {}
+        for day, cents in zip(self.days, self.cents):
+            key = None
+            if day != UNDATED:
+                day = date.fromordinal(day)
+                key = (day.year, day.month)
+            totals[key] = totals.get(key, 0) + cents
+        return totals
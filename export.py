@@ -0,0 +1,186 @@
+"""Streaming export of tasks, expenses and notes to CSV, JSON Lines and HTML.
+
+Records come from generators and are written one at a time, so an export only
+holds a few rows in memory however much data there is. The format follows the
+file extension. The output goes to a temporary file that replaces the target
+once it is complete, so a failed or cancelled export leaves nothing behind.
+
+ExportJob runs an export on a background thread. The Tk thread polls its count
+to show progress (see export_dialog.py).
+"""
+import csv
+import html
+import json
+import os
+import threading
+from functools import lru_cache
+
+from note_store import read_notes
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".html": "html"}
+
+TASK_FIELDS = ("task", "due_date", "completed")
+EXPENSE_FIELDS = ("name", "amount", "date")
+NOTE_FIELDS = ("folder", "note")
+
+# Expense rows converted from the columns at a time
+EXPENSE_CHUNK = 4096
+
+# Records written between progress updates and checks for a cancel
+PROGRESS_EVERY = 1000
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Helvetica, sans-serif; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #CCCCCC; padding: 4px 8px; text-align: left; vertical-align: top; white-space: pre-wrap; }}
+th {{ background: #EAEAEA; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<table>
+<tr>{header}</tr>
+"""
+
+HTML_FOOT = """</table>
+</body>
+</html>
+"""
+
+class ExportCancelled(Exception):
+    pass
+
+def format_for(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown export format {extension!r}; use one of {', '.join(FORMATS)}.")
+    return FORMATS[extension]
+
+def task_records(tasks, completed=None):
+    # tasks is a list taken on the Tk thread, e.g. from TaskStore.due_between
+    for task in tasks:
+        if completed is None or task.completed == completed:
+            yield {"task": task.task, "due_date": task.due_date, "completed": task.completed}
+
+# Expenses share few distinct days, so their text is cached
+@lru_cache(maxsize=4096)
+def day_text(day):
+    from expense_store import format_day
+
+    return format_day(day)
+
+def expense_records(columns, start_day=None, end_day=None):
+    # columns comes from ExpenseStore.columns_snapshot(); days are ordinals.
+    # Undated expenses are left out once either end of the range is set.
+    # expense_store (and NumPy) is imported here so the task and note managers
+    # can import this module without it.
+    from expense_store import UNDATED
+
+    name_table, codes, amounts, days = columns
+    ranged = start_day is not None or end_day is not None
+    for start in range(0, len(amounts), EXPENSE_CHUNK):
+        stop = start + EXPENSE_CHUNK
+        for code, amount, day in zip(codes[start:stop].tolist(), amounts[start:stop].tolist(), days[start:stop].tolist()):
+            if ranged and (day == UNDATED or (start_day is not None and day < start_day)
+                           or (end_day is not None and day > end_day)):
+                continue
+            yield {"name": name_table[code], "amount": amount, "date": day_text(day)}
+
+def note_records(db_path, folder_id=None):
+    for folder_name, body in read_notes(db_path, folder_id):
+        yield {"folder": folder_name, "note": body}
+
+def write_csv(file, fields, records, title):
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    for record in records:
+        writer.writerow([record[field] for field in fields])
+        yield
+
+def write_jsonl(file, fields, records, title):
+    for record in records:
+        file.write(json.dumps(record) + "\n")
+        yield
+
+def write_html(file, fields, records, title):
+    header = "".join(f"<th>{html.escape(field)}</th>" for field in fields)
+    file.write(HTML_HEAD.format(title=html.escape(title), header=header))
+    for record in records:
+        value = (record[field] for field in fields)
+        file.write("<tr>" + "".join(f"<td>{html.escape('' if cell is None else str(cell))}</td>" for cell in value) + "</tr>\n")
+        yield
+    file.write(HTML_FOOT)
+
+# Writers yield once per record written
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "html": write_html}
+
+def export(path, fields, records, title, progress=None, cancel=None):
+    """Writes records to path in the format of its extension; returns the count.
+
+    progress(count) is called every PROGRESS_EVERY records. When the cancel
+    Event is set the export stops with ExportCancelled.
+    """
+    writer = WRITERS[format_for(path)]
+    temp_path = path + ".tmp"
+    count = 0
+    try:
+        # newline="" lets the csv module write its own line endings
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
+            for _ in writer(file, fields, records, title):
+                count += 1
+                if count % PROGRESS_EVERY == 0:
+                    if cancel is not None and cancel.is_set():
+                        raise ExportCancelled()
+                    if progress is not None:
+                        progress(count)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
+
+class ExportJob:
+    """One export running on a background thread.
+
+    count is updated as records are written and is safe to read from the Tk
+    thread. total is the expected number of records when the caller knows it;
+    filtered exports may finish below it. error holds the exception of a failed
+    export.
+    """
+
+    def __init__(self, path, fields, records, title, total=None):
+        self.path = path
+        self.fields = fields
+        self.records = records
+        self.title = title
+        self.total = total
+        self.count = 0
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="export", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.count = export(self.path, self.fields, self.records, self.title, self.set_count, self.cancelled)
+        except ExportCancelled:
+            pass
+        except Exception as error:
+            self.error = error
+
+    def set_count(self, count):
+        self.count = count
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        # Stops the export and waits for its thread, e.g. when the app closes
+        self.cancelled.set()
+        self.thread.join()
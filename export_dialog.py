@@ -0,0 +1,98 @@
+import os
+import tkinter as tk
+from datetime import datetime
+from tkinter import filedialog, messagebox
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Milliseconds between progress checks on a running export
+EXPORT_POLL_INTERVAL = 100
+
+FILE_TYPES = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("HTML", "*.html")]
+
+COMPLETED_CHOICES = (("All", "all"), ("Open", "open"), ("Completed", "completed"))
+
+def parse_date(text):
+    # Blank means the range is open at that end
+    text = text.strip()
+    return datetime.strptime(text, DATE_FORMAT).date() if text else None
+
+def ask_export_options(root, title, date_label=None, completed=False, folder_name=None):
+    """Modal dialog for an export's filters and target file.
+
+    Returns a dict with "path", "start" and "end" (dates or None), "completed"
+    (True, False or None for all) and "folder_only", or None when cancelled.
+    Only the filters asked for are shown: a date range when date_label is
+    given, the completed flag, and the folder when folder_name is given.
+    """
+    chosen = []
+    dialog = tk.Toplevel(root)
+    dialog.title(title)
+    dialog.configure(bg='white')
+
+    dates = date_label is not None
+    if dates:
+        tk.Label(dialog, text=f"{date_label} ({DATE_FORMAT.replace('%', '').upper()}, blank for any):",
+                 font=("Helvetica", 11), bg='white').pack(anchor=tk.W, padx=10, pady=(10, 0))
+        date_frame = tk.Frame(dialog, bg='white')
+        date_frame.pack(padx=10, pady=5, anchor=tk.W)
+        start_entry = tk.Entry(date_frame, font=("Helvetica", 11), width=11, bg='#EAEAEA')
+        start_entry.pack(side=tk.LEFT)
+        tk.Label(date_frame, text="and", font=("Helvetica", 11), bg='white').pack(side=tk.LEFT, padx=5)
+        end_entry = tk.Entry(date_frame, font=("Helvetica", 11), width=11, bg='#EAEAEA')
+        end_entry.pack(side=tk.LEFT)
+
+    completed_var = tk.StringVar(value="all")
+    if completed:
+        completed_frame = tk.Frame(dialog, bg='white')
+        completed_frame.pack(padx=10, pady=5, anchor=tk.W)
+        for text, value in COMPLETED_CHOICES:
+            tk.Radiobutton(completed_frame, text=text, value=value, variable=completed_var,
+                           font=("Helvetica", 11), bg='white').pack(side=tk.LEFT)
+
+    folder_only_var = tk.BooleanVar(value=folder_name is not None)
+    if folder_name is not None:
+        tk.Checkbutton(dialog, text=f"Only the folder \"{folder_name}\"", variable=folder_only_var,
+                       font=("Helvetica", 11), bg='white').pack(padx=10, pady=5, anchor=tk.W)
+
+    def choose():
+        try:
+            start = parse_date(start_entry.get()) if dates else None
+            end = parse_date(end_entry.get()) if dates else None
+        except ValueError:
+            messagebox.showerror("Invalid Date", f"Please enter dates as {DATE_FORMAT.replace('%', '').upper()}.", parent=dialog)
+            return
+        path = filedialog.asksaveasfilename(parent=dialog, title=title, defaultextension=".csv", filetypes=FILE_TYPES)
+        if not path:
+            return
+        chosen.append({"path": path, "start": start, "end": end,
+                       "completed": {"all": None, "open": False, "completed": True}[completed_var.get()],
+                       "folder_only": folder_only_var.get()})
+        dialog.destroy()
+
+    tk.Button(dialog, text="Export...", command=choose, bg='#2196F3', fg='black', font=("Helvetica", 11)).pack(pady=(5, 10))
+    dialog.transient(root)
+    dialog.grab_set()
+    root.wait_window(dialog)
+    return chosen[0] if chosen else None
+
+def progress_text(job):
+    if job.total:
+        return f"Exporting... {min(job.count / job.total, 1):.0%} ({job.count:,} rows)"
+    return f"Exporting... {job.count:,} rows"
+
+def watch_export(root, job, label, on_done=None):
+    # Polls a running ExportJob from the Tk thread and shows its progress in label
+    if not job.done():
+        label.config(text=progress_text(job))
+        root.after(EXPORT_POLL_INTERVAL, watch_export, root, job, label, on_done)
+        return
+    if job.error is not None:
+        label.config(text="Export failed.")
+        messagebox.showerror("Export Failed", str(job.error))
+    elif job.cancelled.is_set():
+        label.config(text="Export cancelled.")
+    else:
+        label.config(text=f"Exported {job.count:,} rows to {os.path.basename(job.path)}.")
+    if on_done is not None:
+        on_done()
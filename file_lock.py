@@ -0,0 +1,54 @@
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """Exclusive cross-process lock on a data file, held with a `with` block.
+
+    The lock lives in a "<path>.lock" side file, which also stores a write
+    sequence number. Every writer bumps it while holding the lock, so other
+    processes can tell that the data file changed without comparing contents
+    or trusting mtime resolution.
+    """
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about ten seconds; keep waiting
+                    pass
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+    def read_seq(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        text = os.read(self.fd, 32).strip()
+        return int(text) if text.isdigit() else 0
+
+    def write_seq(self, seq):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.ftruncate(self.fd, 0)
+        os.write(self.fd, str(seq).encode())
+        os.lseek(self.fd, 0, os.SEEK_SET)
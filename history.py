@@ -0,0 +1,48 @@
+from collections import deque
+
+# Undo steps kept per model; the oldest step is dropped beyond this
+HISTORY_LIMIT = 500
+
+class History:
+    """Undo/redo log of operations.
+
+    Each step stores a label and an undo/redo pair of callables instead of a copy
+    of the data, so a step costs a few objects regardless of dataset size. Items
+    removed by a step are kept alive by reference (or, for notes, in the
+    database trash) only while the step is in the log.
+    """
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.undo_steps = deque(maxlen=limit)
+        self.redo_steps = []
+
+    def record(self, label, undo, redo):
+        self.undo_steps.append((label, undo, redo))
+        self.redo_steps.clear()
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo(self):
+        # Returns the label of the undone step, or None if there was nothing to undo
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        step[1]()
+        self.redo_steps.append(step)
+        return step[0]
+
+    def redo(self):
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        step[2]()
+        self.undo_steps.append(step)
+        return step[0]
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
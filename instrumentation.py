@@ -0,0 +1,212 @@
+"""Opt-in timing histograms and Tk main-loop stall detection.
+
+Start any of the apps with --metrics to enable it. Every Tk callback (button
+commands, key bindings, after() callbacks) and every persistence job is timed
+into a histogram named after the function, and a watchdog thread records the
+main thread's stack whenever the event loop stops answering for longer than
+STALL_THRESHOLD. Everything is written to "<app>_metrics.json" on exit, with
+sorted keys so two runs can be diffed.
+"""
+import atexit
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tkinter
+import traceback
+
+from persistence import PersistenceWorker
+
+# Seconds without a heartbeat from the Tk main loop that count as a stall
+STALL_THRESHOLD = 0.2
+
+# Milliseconds between heartbeats, and seconds between watchdog checks
+HEARTBEAT_INTERVAL = 50
+WATCHDOG_INTERVAL = 0.05
+
+# Histogram bucket upper bounds in milliseconds; slower calls go in the last bucket
+BUCKET_LIMITS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Stalls kept in the metrics file; later ones are only counted
+MAX_STALLS = 50
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_LIMITS_MS) + 1)
+
+    def record(self, seconds):
+        milliseconds = seconds * 1000
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+        for position, limit in enumerate(BUCKET_LIMITS_MS):
+            if milliseconds <= limit:
+                self.buckets[position] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self):
+        labels = [f"<={limit}ms" for limit in BUCKET_LIMITS_MS] + [f">{BUCKET_LIMITS_MS[-1]}ms"]
+        return {"count": self.count, "total_ms": round(self.total, 3), "mean_ms": round(self.total / self.count, 3),
+                "max_ms": round(self.max, 3), "buckets": {label: n for label, n in zip(labels, self.buckets) if n}}
+
+class Metrics:
+    """Histograms by name plus recorded main-loop stalls, safe to use from any thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.histograms = {}
+        self.stalls = []
+        self.stall_count = 0
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # Callbacks of the instrumentation itself, left out of the histograms
+        self.ignored = set()
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def timed(self, name, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def record_stall(self, seconds, stack):
+        with self.lock:
+            self.stall_count += 1
+            if len(self.stalls) < MAX_STALLS:
+                self.stalls.append({"seconds": round(seconds, 3), "stack": stack})
+
+    def to_dict(self):
+        with self.lock:
+            return {"app": self.app, "python": platform.python_version(), "platform": platform.platform(),
+                    "started": self.started, "seconds": round(time.time() - self.started, 3),
+                    "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+                    "stall_count": self.stall_count, "stalls": list(self.stalls)}
+
+    def write(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1, sort_keys=True)
+
+class StallWatchdog:
+    """Detects Tk main-loop stalls from a background thread.
+
+    The main loop bumps a heartbeat from root.after; when the watchdog sees no
+    heartbeat for STALL_THRESHOLD it grabs the main thread's current stack,
+    which is the code holding up the loop. The stall is recorded with its full
+    length once the loop answers again.
+    """
+
+    def __init__(self, root, metrics, threshold=STALL_THRESHOLD):
+        self.root = root
+        self.metrics = metrics
+        self.threshold = threshold
+        self.main_thread_id = threading.main_thread().ident
+        self.last_beat = time.monotonic()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self.beat()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+        if not self.stopped.is_set():
+            self.root.after(HEARTBEAT_INTERVAL, self.beat)
+
+    def watch(self):
+        stalled_since = None
+        stack = None
+        while not self.stopped.wait(WATCHDOG_INTERVAL):
+            last_beat = self.last_beat
+            waited = time.monotonic() - last_beat
+            if stalled_since is None and waited > self.threshold + HEARTBEAT_INTERVAL / 1000:
+                stalled_since = last_beat
+                frame = sys._current_frames().get(self.main_thread_id)
+                stack = traceback.format_stack(frame) if frame is not None else []
+            elif stalled_since is not None and last_beat != stalled_since:
+                self.metrics.record_stall(last_beat - stalled_since - HEARTBEAT_INTERVAL / 1000, stack)
+                stalled_since = None
+
+def callback_name(function):
+    module = getattr(function, "__module__", None) or ""
+    name = getattr(function, "__qualname__", None) or type(function).__name__
+    return f"ui {module}.{name}" if module else f"ui {name}"
+
+def unwrap_after(function):
+    # Misc.after registers a local callit() closure around the scheduled function;
+    # the function itself is read back from the closure so timers are told apart
+    code = getattr(function, "__code__", None)
+    if code is not None and code.co_name == "callit" and "func" in code.co_freevars:
+        return function.__closure__[code.co_freevars.index("func")].cell_contents
+    return function
+
+def instrument_tk(metrics):
+    # Every Python callback Tk invokes goes through CallWrapper.__call__
+    original = tkinter.CallWrapper.__call__
+
+    def call(self, *args):
+        func = unwrap_after(self.func)
+        if func in metrics.ignored:
+            return original(self, *args)
+        start = time.perf_counter()
+        try:
+            return original(self, *args)
+        finally:
+            metrics.record(callback_name(func), time.perf_counter() - start)
+
+    tkinter.CallWrapper.__call__ = call
+
+def instrument_persistence(metrics):
+    original_submit = PersistenceWorker.submit
+    original_flush = PersistenceWorker.flush
+
+    def submit(self, key, job):
+        if isinstance(key, str):
+            name = f"persist {os.path.basename(key)}"
+        else:
+            name = f"persist {getattr(job, '__qualname__', 'job')}"
+        original_submit(self, key, metrics.timed(name, job))
+
+    PersistenceWorker.submit = submit
+    PersistenceWorker.flush = metrics.timed("persist flush (waiting)", original_flush)
+
+def enable(root, app, path=None):
+    """Turns instrumentation on for this process and returns the Metrics."""
+    metrics = Metrics(app)
+    instrument_tk(metrics)
+    instrument_persistence(metrics)
+    watchdog = StallWatchdog(root, metrics)
+    metrics.ignored.add(watchdog.beat)
+    watchdog.start()
+
+    def finish():
+        watchdog.stop()
+        metrics.write(path or f"{app}_metrics.json")
+
+    atexit.register(finish)
+    return metrics
+
+def enable_from_args(root, app):
+    # Instrumentation is opt-in: only with --metrics on the command line
+    if "--metrics" in sys.argv:
+        return enable(root, app)
+    return None
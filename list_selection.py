@@ -0,0 +1,15 @@
+def contiguous_runs(indices):
+    # (first, last) pairs covering sorted indices, e.g. [1, 2, 3, 7] -> [(1, 3), (7, 7)]
+    runs = []
+    for index in indices:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+def delete_rows(listbox, indices):
+    # Removes the rows of a bulk delete from a Listbox without relisting it.
+    # Runs are deleted from the bottom up so earlier indices stay valid.
+    for first, last in reversed(contiguous_runs(sorted(indices))):
+        listbox.delete(first, last)
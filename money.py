@@ -0,0 +1,93 @@
+import locale
+
+CENTS = 100
+
+# Formatted amounts kept per formatter before the cache starts over
+FORMAT_CACHE_SIZE = 65536
+
+def to_cents(amount):
+    # Rounds a dollar amount to whole cents; exact for amounts typed with two decimals
+    return int(round(amount * CENTS))
+
+def load_numpy():
+    # NumPy, or None when it is not installed. Imported on first use so modules the
+    # task manager needs (recurrence, snapshot) do not pull it in at start-up.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def cents_column(amounts):
+    # Dollar amounts (a list or NumPy array) as integer cents, for ExpenseStore columns
+    np = load_numpy()
+    if np is not None:
+        return np.rint(np.asarray(amounts, dtype=np.float64) * CENTS).astype(np.int64)
+    return [to_cents(amount) for amount in amounts]
+
+def to_dollars(cents):
+    return cents / CENTS
+
+class AmountFormatter:
+    """Amounts formatted for the current locale with grouping, cached by value in cents.
+
+    Gives the same text as locale.format_string("%.2f", amount, grouping=True),
+    but builds it from the whole and fractional cents with the locale's
+    separators instead of going through the locale module per value, and keeps
+    each distinct value it has formatted. Call refresh() before a batch of
+    formatting: it rereads the conventions and drops the cache when the
+    numeric locale changed.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.conventions = None
+        self.decimal_point = "."
+        self.thousands_sep = ""
+        self.group_sizes = []
+        self.repeat_last_group = False
+
+    def refresh(self):
+        conventions = locale.localeconv()
+        if conventions != self.conventions:
+            self.conventions = conventions
+            self.decimal_point = conventions["decimal_point"]
+            self.thousands_sep = conventions["thousands_sep"]
+            # Group sizes run from the decimal point left. A 0 repeats the last
+            # size from there on; a list that ends without one, or CHAR_MAX, stops grouping.
+            self.group_sizes = []
+            self.repeat_last_group = False
+            for size in conventions["grouping"]:
+                if size == locale.CHAR_MAX:
+                    break
+                if size == 0:
+                    self.repeat_last_group = bool(self.group_sizes)
+                    break
+                self.group_sizes.append(size)
+            self.cache.clear()
+
+    def format(self, cents):
+        text = self.cache.get(cents)
+        if text is None:
+            if len(self.cache) >= FORMAT_CACHE_SIZE:
+                self.cache.clear()
+            whole, fraction = divmod(abs(cents), CENTS)
+            sign = "-" if cents < 0 else ""
+            text = self.cache[cents] = f"{sign}{self.group(str(whole))}{self.decimal_point}{fraction:02d}"
+        return text
+
+    def group(self, digits):
+        sizes = self.group_sizes
+        if not self.thousands_sep or not sizes:
+            return digits
+        groups = []
+        index = 0
+        while index < len(sizes) or self.repeat_last_group:
+            size = sizes[min(index, len(sizes) - 1)]
+            if len(digits) <= size:
+                break
+            groups.append(digits[-size:])
+            digits = digits[:-size]
+            index += 1
+        groups.append(digits)
+        return self.thousands_sep.join(reversed(groups))
@@ -0,0 +1,89 @@
+import json
+import math
+import os
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def term_counts(text):
+    counts = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+class NoteIndex:
+    """Inverted index from lowercase word tokens to the notes containing them.
+
+    Notes are identified by integer ids. postings maps token -> {note_id: count}.
+    Callers pass the note text back in on removal so the index does not need to
+    keep its own copy of every note.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_count = 0
+
+    def add(self, note_id, text):
+        for token, count in term_counts(text).items():
+            self.postings.setdefault(token, {})[note_id] = count
+        self.doc_count += 1
+
+    def remove(self, note_id, text):
+        for token in term_counts(text):
+            notes = self.postings.get(token)
+            if notes is not None:
+                notes.pop(note_id, None)
+                if not notes:
+                    del self.postings[token]
+        self.doc_count -= 1
+
+    def search(self, query, limit=50):
+        # Every query token must match; hits are ranked by tf-idf
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        matches = [self.postings.get(token) for token in tokens]
+        if not all(matches):
+            return []
+
+        matches.sort(key=len)
+        candidates = set(matches[0])
+        for notes in matches[1:]:
+            candidates.intersection_update(notes)
+            if not candidates:
+                return []
+
+        scores = {}
+        for notes in matches:
+            idf = math.log(1 + self.doc_count / len(notes))
+            for note_id in candidates:
+                scores[note_id] = scores.get(note_id, 0.0) + notes[note_id] * idf
+        return sorted(scores, key=lambda note_id: (-scores[note_id], note_id))[:limit]
+
+    def save(self, path, generation):
+        data = {
+            "generation": generation,
+            "doc_count": self.doc_count,
+            "postings": {token: list(notes.items()) for token, notes in self.postings.items()},
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(temp_path, path)
+
+    def load(self, path, generation):
+        # Returns False when the file is missing or was written for other note data
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return False
+        if data.get("generation") != generation:
+            return False
+        self.doc_count = data["doc_count"]
+        self.postings = {token: dict((note_id, count) for note_id, count in notes)
+                         for token, notes in data["postings"].items()}
+        return True
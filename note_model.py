@@ -0,0 +1,271 @@
+from history import History
+from note_index import NoteIndex
+from note_store import NoteStore, make_preview
+
+class NoteModel:
+    """Note folders, their notes and the search index, independent of tkinter.
+
+    folders is a list of {"id", "name", "previews", "note_ids"} dicts in display
+    order. "previews" and "note_ids" stay None until the folder is first opened.
+    Full note bodies are not kept in memory; note_body reads one when needed.
+    Edits record their inverse in history so they can be undone and redone.
+    """
+
+    def __init__(self, db_path, json_path, index_path, persistence=None):
+        self.json_path = json_path
+        self.index_path = index_path
+        self.store = NoteStore(db_path, persistence)
+        self.index = NoteIndex()
+        self.folders = []
+        self.folders_by_id = {}
+        self.history = History()
+        # MigrationStats of upgrades done while opening and loading
+        self.migrations = self.store.migrations
+
+    def load(self):
+        self.store.migrate_from_json(self.json_path)
+
+        # Only folder names are read up front; notes are loaded per folder on demand
+        for folder_id, name in self.store.folders():
+            folder = {"id": folder_id, "name": name, "previews": None, "note_ids": None}
+            self.folders.append(folder)
+            self.folders_by_id[folder_id] = folder
+
+        if not self.index.load(self.index_path, self.store.generation()):
+            self.rebuild_index()
+
+    def close(self):
+        # The index is only written on exit; a stale or missing one is rebuilt on load
+        self.store.settle()
+        self.index.save(self.index_path, self.store.generation())
+        self.store.close()
+
+    def load_folder_notes(self, folder):
+        if folder["previews"] is None:
+            rows = self.store.notes(folder["id"])
+            folder["note_ids"] = [note_id for note_id, preview in rows]
+            folder["previews"] = [preview for note_id, preview in rows]
+        return folder
+
+    def note_body(self, folder, note_index):
+        return self.store.note_body(folder["note_ids"][note_index])
+
+    def rebuild_index(self):
+        self.index = NoteIndex()
+        for note_id, body in self.store.iter_notes():
+            self.index.add(note_id, body)
+
+    def forget_notes(self, folder):
+        for note_id, body in self.store.folder_bodies(folder["id"]):
+            self.index.remove(note_id, body)
+
+    def add_folder(self, name):
+        folder_id = self.store.add_folder(name)
+        folder = {"id": folder_id, "name": name, "previews": [], "note_ids": []}
+        self.folders.append(folder)
+        self.folders_by_id[folder_id] = folder
+        folder_index = len(self.folders) - 1
+        batch = self.store.new_batch()
+        self.history.record("add folder", lambda: self.trash_folder(folder_index, batch),
+                            lambda: self.restore_folder(folder_index, folder, batch))
+        return folder
+
+    def rename_folder(self, folder, name):
+        previous = folder["name"]
+        self.set_folder_name(folder, name)
+        self.history.record("rename folder", lambda: self.set_folder_name(folder, previous),
+                            lambda: self.set_folder_name(folder, name))
+
+    def delete_folder(self, folder_index):
+        folder = self.folders[folder_index]
+        batch = self.store.new_batch()
+        self.trash_folder(folder_index, batch)
+        self.history.record("delete folder", lambda: self.restore_folder(folder_index, folder, batch),
+                            lambda: self.trash_folder(folder_index, batch))
+
+    def add_note(self, folder, note_text):
+        self.load_folder_notes(folder)
+        note_id = self.store.add_note(folder["id"], note_text)
+        folder["previews"].append(make_preview(note_text))
+        folder["note_ids"].append(note_id)
+        self.index.add(note_id, note_text)
+        note_index = len(folder["note_ids"]) - 1
+        batch = self.store.new_batch()
+        self.history.record("add note", lambda: self.trash_note(folder, note_index, batch),
+                            lambda: self.restore_note(folder, note_index, note_id, batch))
+        return note_id
+
+    def remove_note(self, folder, note_index):
+        self.load_folder_notes(folder)
+        note_id = folder["note_ids"][note_index]
+        batch = self.store.new_batch()
+        self.trash_note(folder, note_index, batch)
+        self.history.record("remove note", lambda: self.restore_note(folder, note_index, note_id, batch),
+                            lambda: self.trash_note(folder, note_index, batch))
+
+    def remove_notes(self, folder, note_indices):
+        # A whole selection is one undo step and one store transaction
+        self.load_folder_notes(folder)
+        note_indices = sorted(set(note_indices))
+        note_ids = [folder["note_ids"][note_index] for note_index in note_indices]
+        batch = self.store.new_batch()
+        self.trash_notes(folder, note_indices, batch)
+        self.history.record("remove notes", lambda: self.restore_notes(folder, note_indices, note_ids, batch),
+                            lambda: self.trash_notes(folder, note_indices, batch))
+
+    def move_notes(self, folder, note_indices, target):
+        self.load_folder_notes(folder)
+        note_ids = [folder["note_ids"][note_index] for note_index in sorted(set(note_indices))]
+        self.transfer_notes(folder, note_ids, target)
+        self.history.record("move notes", lambda: self.transfer_notes(target, note_ids, folder),
+                            lambda: self.transfer_notes(folder, note_ids, target))
+
+    def copy_notes(self, folder, note_indices, target):
+        # Copies share the stored text of the originals; only the references are written
+        self.load_folder_notes(folder)
+        note_indices = sorted(set(note_indices))
+        note_ids = [folder["note_ids"][note_index] for note_index in note_indices]
+        copy_ids = self.store.copy_notes(note_ids, target["id"])
+        # Copies get the newest ids, so they go at the end of the target
+        if target["previews"] is not None:
+            target["note_ids"].extend(copy_ids)
+            target["previews"].extend(folder["previews"][note_index] for note_index in note_indices)
+        bodies = self.store.note_bodies(note_ids)
+        for copy_id, note_id in zip(copy_ids, note_ids):
+            self.index.add(copy_id, bodies[note_id])
+        batch = self.store.new_batch()
+        self.history.record("copy notes", lambda: self.drop_copies(target, copy_ids, batch),
+                            lambda: self.restore_copies(target, copy_ids, batch))
+        return copy_ids
+
+    def clear_folder(self, folder):
+        batch = self.store.new_batch()
+        self.empty_folder(folder, batch)
+        self.history.record("clear folder", lambda: self.refill_folder(folder, batch),
+                            lambda: self.empty_folder(folder, batch))
+
+    def undo(self):
+        # Returns the label of the undone step, or None
+        return self.history.undo()
+
+    def redo(self):
+        return self.history.redo()
+
+    # Each step below has an inverse; deleted rows wait in the store's trash
+    # under the step's batch number until the step is undone.
+
+    def set_folder_name(self, folder, name):
+        folder["name"] = name
+        self.store.rename_folder(folder["id"], name)
+
+    def trash_folder(self, folder_index, batch):
+        folder = self.folders[folder_index]
+        self.forget_notes(folder)
+        self.store.delete_folder(folder["id"], batch)
+        del self.folders_by_id[folder["id"]]
+        del self.folders[folder_index]
+
+    def restore_folder(self, folder_index, folder, batch):
+        self.store.restore(batch)
+        self.folders.insert(folder_index, folder)
+        self.folders_by_id[folder["id"]] = folder
+        for note_id, body in self.store.folder_bodies(folder["id"]):
+            self.index.add(note_id, body)
+
+    def trash_note(self, folder, note_index, batch):
+        self.load_folder_notes(folder)
+        note_id = folder["note_ids"].pop(note_index)
+        del folder["previews"][note_index]
+        self.index.remove(note_id, self.store.note_body(note_id))
+        self.store.delete_note(note_id, batch)
+
+    def restore_note(self, folder, note_index, note_id, batch):
+        # The folder is loaded before the restore so the note is not listed twice
+        self.load_folder_notes(folder)
+        self.store.restore(batch)
+        body = self.store.note_body(note_id)
+        folder["note_ids"].insert(note_index, note_id)
+        folder["previews"].insert(note_index, make_preview(body))
+        self.index.add(note_id, body)
+
+    def trash_notes(self, folder, note_indices, batch):
+        self.load_folder_notes(folder)
+        note_ids = [folder["note_ids"][note_index] for note_index in note_indices]
+        removed = set(note_indices)
+        folder["note_ids"] = [note_id for note_index, note_id in enumerate(folder["note_ids"]) if note_index not in removed]
+        folder["previews"] = [preview for note_index, preview in enumerate(folder["previews"]) if note_index not in removed]
+        for note_id, body in self.store.note_bodies(note_ids).items():
+            self.index.remove(note_id, body)
+        self.store.delete_notes(note_ids, batch)
+
+    def restore_notes(self, folder, note_indices, note_ids, batch):
+        self.load_folder_notes(folder)
+        self.store.restore(batch)
+        bodies = self.store.note_bodies(note_ids)
+        for note_index, note_id in zip(note_indices, note_ids):
+            folder["note_ids"].insert(note_index, note_id)
+            folder["previews"].insert(note_index, make_preview(bodies[note_id]))
+            self.index.add(note_id, bodies[note_id])
+
+    def transfer_notes(self, source, note_ids, target):
+        # Folders list their notes by id, so moved notes are merged into the target in id order.
+        # A target that was never opened reads them from the store when it is.
+        self.load_folder_notes(source)
+        moving = set(note_ids)
+        rows = list(zip(source["note_ids"], source["previews"]))
+        kept = [row for row in rows if row[0] not in moving]
+        moved = [row for row in rows if row[0] in moving]
+        source["note_ids"] = [note_id for note_id, preview in kept]
+        source["previews"] = [preview for note_id, preview in kept]
+        if target["previews"] is not None:
+            merged = sorted(list(zip(target["note_ids"], target["previews"])) + moved)
+            target["note_ids"] = [note_id for note_id, preview in merged]
+            target["previews"] = [preview for note_id, preview in merged]
+        self.store.move_notes(note_ids, target["id"])
+
+    def drop_copies(self, target, copy_ids, batch):
+        self.load_folder_notes(target)
+        positions = {note_id: note_index for note_index, note_id in enumerate(target["note_ids"])}
+        self.trash_notes(target, sorted(positions[copy_id] for copy_id in copy_ids), batch)
+
+    def restore_copies(self, target, copy_ids, batch):
+        # The target is listed again from the store when next opened
+        self.store.restore(batch)
+        target["previews"] = None
+        target["note_ids"] = None
+        for note_id, body in self.store.note_bodies(copy_ids).items():
+            self.index.add(note_id, body)
+
+    def empty_folder(self, folder, batch):
+        self.forget_notes(folder)
+        self.store.clear_folder(folder["id"], batch)
+        folder["previews"] = []
+        folder["note_ids"] = []
+
+    def refill_folder(self, folder, batch):
+        self.store.restore(batch)
+        folder["previews"] = None
+        folder["note_ids"] = None
+        for note_id, body in self.store.folder_bodies(folder["id"]):
+            self.index.add(note_id, body)
+
+    def search(self, query, limit):
+        # Returns ranked (note_id, folder, preview) hits
+        note_ids = self.index.search(query, limit)
+        found = self.store.notes_by_id(note_ids)
+        hits = []
+        for note_id in note_ids:
+            if note_id in found:
+                folder_id, preview = found[note_id]
+                hits.append((note_id, self.folders_by_id[folder_id], preview))
+        return hits
+
+    def locate(self, note_id, folder):
+        # Returns (folder_index, note_index) of a note, loading its folder if needed,
+        # or None once the folder or the note is gone
+        if self.folders_by_id.get(folder["id"]) is not folder:
+            return None
+        self.load_folder_notes(folder)
+        if note_id not in folder["note_ids"]:
+            return None
+        return self.folders.index(folder), folder["note_ids"].index(note_id)
@@ -0,0 +1,352 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from schema import CURRENT_VERSIONS, LEGACY_VERSION, NOTES, RECORDS_KEYS, JsonStream, MigrationStats
+
+TABLES = """
+CREATE TABLE IF NOT EXISTS folders (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blobs (hash BLOB PRIMARY KEY, body TEXT NOT NULL, preview TEXT NOT NULL, refs INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, folder_id INTEGER NOT NULL, blob BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS trash_folders (batch INTEGER NOT NULL, id INTEGER NOT NULL, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS trash_notes (batch INTEGER NOT NULL, id INTEGER NOT NULL, folder_id INTEGER NOT NULL, blob BLOB NOT NULL);
+"""
+
+# Created after upgrade(), which may rebuild the tables they belong to. A blob's
+# refs counts the notes and trashed notes pointing at it; the blob is dropped
+# when the last one goes.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS notes_by_folder ON notes (folder_id, id);
+CREATE INDEX IF NOT EXISTS trash_notes_by_batch ON trash_notes (batch);
+CREATE TRIGGER IF NOT EXISTS notes_ref AFTER INSERT ON notes BEGIN
+    UPDATE blobs SET refs = refs + 1 WHERE hash = NEW.blob;
+END;
+CREATE TRIGGER IF NOT EXISTS notes_unref AFTER DELETE ON notes BEGIN
+    UPDATE blobs SET refs = refs - 1 WHERE hash = OLD.blob;
+    DELETE FROM blobs WHERE hash = OLD.blob AND refs = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS trash_notes_ref AFTER INSERT ON trash_notes BEGIN
+    UPDATE blobs SET refs = refs + 1 WHERE hash = NEW.blob;
+END;
+CREATE TRIGGER IF NOT EXISTS trash_notes_unref AFTER DELETE ON trash_notes BEGIN
+    UPDATE blobs SET refs = refs - 1 WHERE hash = OLD.blob;
+    DELETE FROM blobs WHERE hash = OLD.blob AND refs = 0;
+END;
+"""
+
+# Stores a note's text unless a note with the same text is already stored
+ADD_BLOB = "INSERT INTO blobs (hash, body, preview) VALUES (?, ?, ?) ON CONFLICT (hash) DO NOTHING"
+
+NOTE_BLOBS = "notes JOIN blobs ON blobs.hash = notes.blob"
+
+# Ids per "IN (...)" query, below SQLite's limit on bound parameters
+ID_CHUNK = 500
+
+# Characters of a note shown in lists; the full body is read when the note is opened
+PREVIEW_LENGTH = 60
+
+def id_chunks(note_ids):
+    # Yields (chunk, placeholders) pairs for "WHERE id IN (...)" queries
+    note_ids = list(note_ids)
+    for start in range(0, len(note_ids), ID_CHUNK):
+        chunk = note_ids[start:start + ID_CHUNK]
+        yield chunk, ",".join("?" * len(chunk))
+
+def content_hash(body):
+    return hashlib.sha256(body.encode("utf-8")).digest()
+
+def make_preview(body):
+    # First line of the note, marked with "..." when anything was cut off
+    body = body.strip()
+    first_line = body.split("\n", 1)[0]
+    if len(first_line) > PREVIEW_LENGTH or len(first_line) < len(body):
+        return first_line[:PREVIEW_LENGTH].rstrip() + "..."
+    return first_line
+
+class NoteStore:
+    """SQLite storage for note folders and notes.
+
+    Folder names are cheap to list. Listing a folder or a search hit only reads
+    the stored preview of each note; a full body is read by id when opened.
+    Every mutation is its own transaction and bumps the "generation" counter,
+    which the search index uses to detect staleness.
+
+    When a PersistenceWorker is given, mutations are committed on its thread.
+    Row ids are handed out up front so callers get them back immediately, and
+    note reads wait for queued writes first.
+
+    Note text is stored once per distinct body in blobs, keyed by its SHA-256;
+    notes and trashed notes refer to it by hash. Adding or copying a note whose
+    text is already stored only writes the reference, and triggers keep each
+    blob's reference count and drop it with its last note.
+
+    Deleted rows are moved to trash tables under a batch number so an undo can
+    put them back with restore(batch). The trash only lives for one session.
+
+    The schema version is kept in PRAGMA user_version. Upgrades done on open,
+    and the import of the old JSON file, are recorded in migrations.
+    """
+
+    def __init__(self, path, persistence=None):
+        self.path = path
+        self.persistence = persistence
+        self.migrations = []
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(TABLES)
+        self.upgrade()
+        self.connection.executescript(INDEXES)
+        self.empty_trash()
+        self.next_batch = 0
+        self.next_folder_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM folders").fetchone()[0]
+        self.next_note_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM notes").fetchone()[0]
+
+    def close(self):
+        self.settle()
+        self.empty_trash()
+        self.connection.close()
+
+    def write(self, *statements):
+        def commit():
+            with self.connection:
+                for sql, params in statements:
+                    self.connection.execute(sql, params)
+                self.bump_generation()
+
+        if self.persistence is not None:
+            self.persistence.submit(None, commit)
+        else:
+            commit()
+
+    def upgrade(self):
+        # Version 0 is a database from before versions were kept, which may predate previews.
+        # Before version 3 note text was stored inline in notes.
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        current = CURRENT_VERSIONS[NOTES]
+        if version > current:
+            raise ValueError(f"{self.path} is version {version}, newer than this app supports ({current})")
+        if version == current:
+            return
+        started = time.perf_counter()
+        count = 0
+        if "body" in self.columns("notes"):
+            self.add_previews()
+            count = self.move_to_blobs()
+        with self.connection:
+            self.connection.execute(f"PRAGMA user_version = {current}")
+        if count:
+            self.migrations.append(MigrationStats(self.path, NOTES, version, current, count, 0, time.perf_counter() - started))
+
+    def columns(self, table):
+        return [row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")]
+
+    def add_previews(self):
+        # Databases created before previews existed get the column and a one-off
+        # backfill, done inside SQLite; returns the number of notes filled in
+        with self.connection:
+            if "preview" not in self.columns("notes"):
+                self.connection.execute("ALTER TABLE notes ADD COLUMN preview TEXT")
+            self.connection.create_function("make_preview", 1, make_preview, deterministic=True)
+            return self.connection.execute("UPDATE notes SET preview = make_preview(body) WHERE preview IS NULL").rowcount
+
+    def move_to_blobs(self):
+        # Moves inline note text into blobs, one copy per distinct body, and
+        # rebuilds notes around the hashes; returns the number of notes moved.
+        # The trash is emptied on open anyway, so its table is just recreated.
+        with self.connection:
+            self.connection.create_function("content_hash", 1, content_hash, deterministic=True)
+            self.connection.execute(
+                "INSERT INTO blobs (hash, body, preview, refs) "
+                "SELECT content_hash(body), body, preview, COUNT(*) FROM notes GROUP BY body")
+            self.connection.execute("CREATE TABLE notes_v3 (id INTEGER PRIMARY KEY, folder_id INTEGER NOT NULL, blob BLOB NOT NULL)")
+            count = self.connection.execute(
+                "INSERT INTO notes_v3 SELECT id, folder_id, content_hash(body) FROM notes").rowcount
+            self.connection.execute("DROP TABLE notes")
+            self.connection.execute("ALTER TABLE notes_v3 RENAME TO notes")
+            self.connection.execute("DROP TABLE trash_notes")
+            self.connection.execute(
+                "CREATE TABLE trash_notes (batch INTEGER NOT NULL, id INTEGER NOT NULL, folder_id INTEGER NOT NULL, blob BLOB NOT NULL)")
+        return count
+
+    def blob_stats(self):
+        # Returns (notes, distinct bodies stored, characters stored)
+        self.settle()
+        return self.connection.execute(
+            "SELECT (SELECT COUNT(*) FROM notes), COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM blobs").fetchone()
+
+    def empty_trash(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM trash_folders")
+            self.connection.execute("DELETE FROM trash_notes")
+
+    def settle(self):
+        if self.persistence is not None:
+            self.persistence.flush()
+
+    def generation(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self):
+        self.connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    def is_empty(self):
+        return self.connection.execute("SELECT NOT EXISTS (SELECT 1 FROM folders)").fetchone()[0]
+
+    def folders(self):
+        return self.connection.execute("SELECT id, name FROM folders ORDER BY id").fetchall()
+
+    def notes(self, folder_id):
+        # Returns (note_id, preview) rows
+        self.settle()
+        return self.connection.execute(
+            f"SELECT notes.id, blobs.preview FROM {NOTE_BLOBS} WHERE notes.folder_id = ? ORDER BY notes.id", (folder_id,)).fetchall()
+
+    def note_body(self, note_id):
+        self.settle()
+        row = self.connection.execute(f"SELECT blobs.body FROM {NOTE_BLOBS} WHERE notes.id = ?", (note_id,)).fetchone()
+        return row[0] if row else None
+
+    def folder_bodies(self, folder_id):
+        self.settle()
+        return self.connection.execute(f"SELECT notes.id, blobs.body FROM {NOTE_BLOBS} WHERE notes.folder_id = ?", (folder_id,))
+
+    def notes_by_id(self, note_ids):
+        # Returns {note_id: (folder_id, preview)} for the given ids
+        self.settle()
+        found = {}
+        for chunk, placeholders in id_chunks(note_ids):
+            for note_id, folder_id, preview in self.connection.execute(
+                    f"SELECT notes.id, notes.folder_id, blobs.preview FROM {NOTE_BLOBS} WHERE notes.id IN ({placeholders})", chunk):
+                found[note_id] = (folder_id, preview)
+        return found
+
+    def note_bodies(self, note_ids):
+        # Returns {note_id: body} for the given ids
+        self.settle()
+        bodies = {}
+        for chunk, placeholders in id_chunks(note_ids):
+            bodies.update(self.connection.execute(f"SELECT notes.id, blobs.body FROM {NOTE_BLOBS} WHERE notes.id IN ({placeholders})", chunk))
+        return bodies
+
+    def iter_notes(self):
+        return self.connection.execute(f"SELECT notes.id, blobs.body FROM {NOTE_BLOBS}")
+
+    def note_count(self, folder_id=None):
+        # Notes in one folder, or in all of them
+        self.settle()
+        if folder_id is None:
+            return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM notes WHERE folder_id = ?", (folder_id,)).fetchone()[0]
+
+    def add_folder(self, name):
+        folder_id = self.next_folder_id
+        self.next_folder_id += 1
+        self.write(("INSERT INTO folders (id, name) VALUES (?, ?)", (folder_id, name)))
+        return folder_id
+
+    def rename_folder(self, folder_id, name):
+        self.write(("UPDATE folders SET name = ? WHERE id = ?", (name, folder_id)))
+
+    def new_batch(self):
+        self.next_batch += 1
+        return self.next_batch
+
+    def delete_folder(self, folder_id, batch):
+        self.write(("INSERT INTO trash_notes SELECT ?, id, folder_id, blob FROM notes WHERE folder_id = ?", (batch, folder_id)),
+                   ("INSERT INTO trash_folders SELECT ?, id, name FROM folders WHERE id = ?", (batch, folder_id)),
+                   ("DELETE FROM notes WHERE folder_id = ?", (folder_id,)),
+                   ("DELETE FROM folders WHERE id = ?", (folder_id,)))
+
+    def add_note(self, folder_id, body):
+        note_id = self.next_note_id
+        self.next_note_id += 1
+        blob = content_hash(body)
+        self.write((ADD_BLOB, (blob, body, make_preview(body))),
+                   ("INSERT INTO notes (id, folder_id, blob) VALUES (?, ?, ?)", (note_id, folder_id, blob)))
+        return note_id
+
+    def copy_notes(self, note_ids, folder_id):
+        # The copies refer to the same blobs, so no note text is written; returns the new ids
+        copy_ids = list(range(self.next_note_id, self.next_note_id + len(note_ids)))
+        self.next_note_id += len(note_ids)
+        self.write(*(("INSERT INTO notes (id, folder_id, blob) SELECT ?, ?, blob FROM notes WHERE id = ?", (copy_id, folder_id, note_id))
+                     for copy_id, note_id in zip(copy_ids, note_ids)))
+        return copy_ids
+
+    def delete_note(self, note_id, batch):
+        self.write(("INSERT INTO trash_notes SELECT ?, id, folder_id, blob FROM notes WHERE id = ?", (batch, note_id)),
+                   ("DELETE FROM notes WHERE id = ?", (note_id,)))
+
+    def delete_notes(self, note_ids, batch):
+        # Many notes in one transaction
+        statements = []
+        for chunk, placeholders in id_chunks(note_ids):
+            statements.append((f"INSERT INTO trash_notes SELECT ?, id, folder_id, blob FROM notes WHERE id IN ({placeholders})",
+                               (batch, *chunk)))
+            statements.append((f"DELETE FROM notes WHERE id IN ({placeholders})", chunk))
+        self.write(*statements)
+
+    def move_notes(self, note_ids, folder_id):
+        self.write(*((f"UPDATE notes SET folder_id = ? WHERE id IN ({placeholders})", (folder_id, *chunk))
+                     for chunk, placeholders in id_chunks(note_ids)))
+
+    def clear_folder(self, folder_id, batch):
+        self.write(("INSERT INTO trash_notes SELECT ?, id, folder_id, blob FROM notes WHERE folder_id = ?", (batch, folder_id)),
+                   ("DELETE FROM notes WHERE folder_id = ?", (folder_id,)))
+
+    def restore(self, batch):
+        # Puts back everything deleted under batch, with the original ids
+        self.write(("INSERT INTO folders (id, name) SELECT id, name FROM trash_folders WHERE batch = ?", (batch,)),
+                   ("INSERT INTO notes (id, folder_id, blob) SELECT id, folder_id, blob FROM trash_notes WHERE batch = ?", (batch,)),
+                   ("DELETE FROM trash_folders WHERE batch = ?", (batch,)),
+                   ("DELETE FROM trash_notes WHERE batch = ?", (batch,)))
+
+    def migrate_from_json(self, json_path):
+        # One-time import of the old notes_data.json, streamed a folder at a time;
+        # the file is renamed afterwards. Returns the MigrationStats, or None.
+        if not os.path.exists(json_path) or not self.is_empty():
+            return None
+        started = time.perf_counter()
+        count = 0
+        with open(json_path, "r") as file, self.connection:
+            stream = JsonStream(file)
+            for key in stream.keys():
+                if key != RECORDS_KEYS[NOTES]:
+                    stream.value()
+                    continue
+                for folder in stream.items():
+                    folder_id = self.connection.execute(
+                        "INSERT INTO folders (name) VALUES (?)", (folder["name"],)).lastrowid
+                    blobs = [content_hash(note) for note in folder["notes"]]
+                    self.connection.executemany(
+                        ADD_BLOB, ((blob, note, make_preview(note)) for blob, note in zip(blobs, folder["notes"])))
+                    self.connection.executemany(
+                        "INSERT INTO notes (folder_id, blob) VALUES (?, ?)", ((folder_id, blob) for blob in blobs))
+                    count += len(folder["notes"])
+            self.bump_generation()
+        self.next_folder_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM folders").fetchone()[0]
+        self.next_note_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM notes").fetchone()[0]
+        size = os.path.getsize(json_path)
+        os.replace(json_path, json_path + ".migrated")
+        stats = MigrationStats(json_path, NOTES, LEGACY_VERSION, CURRENT_VERSIONS[NOTES], count, size, time.perf_counter() - started)
+        self.migrations.append(stats)
+        return stats
+
+def read_notes(path, folder_id=None):
+    # Yields (folder name, body) in folder and note order. It reads on a connection
+    # of its own, so an export thread can stream notes while the app keeps editing.
+    connection = sqlite3.connect(path)
+    try:
+        sql = f"SELECT folders.name, blobs.body FROM {NOTE_BLOBS} JOIN folders ON folders.id = notes.folder_id"
+        params = ()
+        if folder_id is not None:
+            sql += " WHERE notes.folder_id = ?"
+            params = (folder_id,)
+        yield from connection.execute(sql + " ORDER BY notes.folder_id, notes.id", params)
+    finally:
+        connection.close()
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import traceback
+
+# Seconds the worker waits after the first queued write so a burst coalesces
+COALESCE_DELAY = 0.25
+
+def write_json_atomic(path, data, default=None):
+    # Write to a temp file and swap it in, so readers and crashes never see a partial file
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, default=default)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+class PersistenceWorker:
+    """Write-behind thread that runs save jobs off the Tk main thread.
+
+    Jobs are submitted under a key. A job replaces any still-pending job with the
+    same key and moves to the back of the queue, so repeated saves of one file
+    collapse into a single write of the latest data. Jobs submitted with key None
+    are never coalesced. Jobs run in submission order on one thread.
+    """
+
+    def __init__(self, delay=COALESCE_DELAY):
+        self.delay = delay
+        self.pending = {}
+        self.busy = False
+        self.hurry = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, job):
+        with self.condition:
+            if key is None:
+                key = object()
+            self.pending.pop(key, None)
+            self.pending[key] = job
+            self.condition.notify_all()
+
+    def save_json(self, path, data, default=None):
+        # data must be a snapshot the caller will not mutate afterwards
+        self.submit(path, lambda: write_json_atomic(path, data, default))
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                # Give a burst of edits time to land, unless someone is waiting on us
+                self.condition.wait_for(lambda: self.hurry or self.closed, timeout=self.delay)
+                jobs = list(self.pending.values())
+                self.pending.clear()
+                self.busy = True
+
+            for job in jobs:
+                try:
+                    job()
+                except Exception:
+                    traceback.print_exc()
+
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def flush(self):
+        # Blocks until every job submitted so far has been written
+        with self.condition:
+            self.hurry = True
+            self.condition.notify_all()
+            self.condition.wait_for(lambda: not self.pending and not self.busy)
+            self.hurry = False
+
+    def close(self):
+        with self.condition:
+            self.hurry = True
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
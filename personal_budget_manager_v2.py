@@ -1,136 +1,276 @@
-import tkinter as tk
-from tkinter import messagebox
-import json
-
-SAVE_FILE_PATH = "budget_data.json"
-
-class BudgetManager:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Budget Manager [v2]")
-        self.root.geometry("400x540")
-        self.root.configure(bg='white')
-
-        self.budget = 0
-        self.expenses = []
-
-        self.load_data()
-        self.create_ui()
-
-    def load_data(self):
-        try:
-            with open(SAVE_FILE_PATH, "r") as file:
-                data = json.load(file)
-                self.budget = data.get("budget", 0)
-                self.expenses = data.get("expenses", [])
-        except FileNotFoundError:
-            pass
-
-    def save_data(self):
-        data = {"budget": self.budget, "expenses": self.expenses}
-        with open(SAVE_FILE_PATH, "w") as file:
-            json.dump(data, file)
-
-    def set_budget(self):
-        budget_input = self.budget_entry.get()
-        if not budget_input:
-            messagebox.showwarning("Missing Input", "Please enter a budget amount.")
-            return
-
-        try:
-            self.budget = float(budget_input)
-        except ValueError:
-            messagebox.showerror("Invalid Input", "Please enter a valid budget amount (numeric value).")
-        else:
-            self.update_budget_label()
-            self.save_data()
-            self.budget_entry.delete(0, tk.END)
-
-    def add_expense(self):
-        expense_name = self.expense_name_entry.get()
-        expense_amount = self.expense_amount_entry.get()
-
-        if not (expense_name and expense_amount):
-            messagebox.showwarning("Missing Input", "Please enter both the expense name and amount.")
-            return
-
-        try:
-            expense_amount = float(expense_amount)
-        except ValueError:
-            messagebox.showerror("Invalid Input", "Please enter a valid expense amount (numeric value).")
-        else:
-            self.expenses.append((expense_name, expense_amount))
-            self.update_expense_list()
-            self.update_budget_label()
-            self.clear_input_fields()
-            self.save_data()
-
-    def remove_expense(self):
-        selected_expense_index = self.expense_listbox.curselection()
-        if selected_expense_index:
-            index = selected_expense_index[0]
-            removed_expense = self.expenses.pop(index)
-            self.update_expense_list()
-            self.update_budget_label()
-            self.save_data()
-
-    def clear_all_expenses(self):
-        self.expenses = []
-        self.update_expense_list()
-        self.update_budget_label()
-        self.save_data()
-
-    def update_expense_list(self):
-        self.expense_listbox.delete(0, tk.END)
-        for expense in self.expenses:
-            self.expense_listbox.insert(tk.END, f"{expense[0]} (${expense[1]:.2f})")
-
-    def update_budget_label(self):
-        remaining_budget = self.budget - sum(expense[1] for expense in self.expenses)
-        self.budget_label.config(text=f"Remaining Budget: ${remaining_budget:.2f}")
-
-    def clear_input_fields(self):
-        self.expense_name_entry.delete(0, tk.END)
-        self.expense_amount_entry.delete(0, tk.END)
-
-    def create_ui(self):
-        self.budget_label = tk.Label(self.root, text="Enter Your Budget:", font=("Helvetica", 12), bg='white')
-        self.budget_label.pack(pady=5)
-
-        self.budget_entry = tk.Entry(self.root, font=("Helvetica", 12), width=12, bg='#EAEAEA')
-        self.budget_entry.pack(pady=5)
-
-        set_budget_button = tk.Button(self.root, text="Set Budget", command=self.set_budget, bg='#4CAF50', fg='black', font=("Helvetica", 12))
-        set_budget_button.pack(pady=5)
-
-        expense_name_label = tk.Label(self.root, text="Expense Name:", font=("Helvetica", 12), bg='white')
-        expense_name_label.pack(pady=5)
-
-        self.expense_name_entry = tk.Entry(self.root, font=("Helvetica", 12), width=20, bg='#EAEAEA')
-        self.expense_name_entry.pack(pady=5)
-
-        expense_amount_label = tk.Label(self.root, text="Expense Amount ($):", font=("Helvetica", 12), bg='white')
-        expense_amount_label.pack(pady=5)
-
-        self.expense_amount_entry = tk.Entry(self.root, font=("Helvetica", 12), width=10, bg='#EAEAEA')
-        self.expense_amount_entry.pack(pady=5)
-        
-        add_expense_button = tk.Button(self.root, text="Add Expense", command=self.add_expense, bg='#2196F3', fg='black', font=("Helvetica", 12))
-        add_expense_button.pack(pady=5)
-
-        self.expense_listbox = tk.Listbox(self.root, font=("Helvetica", 12), width=40, bg='#EAEAEA')
-        self.expense_listbox.pack(pady=5)
-
-        remove_expense_button = tk.Button(self.root, text="Remove Expense", command=self.remove_expense, bg='#F44336', fg='black', font=("Helvetica", 12))
-        remove_expense_button.pack(side=tk.LEFT, padx=(35, 0))
-
-        clear_all_expenses_button = tk.Button(self.root, text="Clear All Expenses", command=self.clear_all_expenses, bg='#FF5722', fg='black', font=("Helvetica", 12))
-        clear_all_expenses_button.pack(side=tk.RIGHT, pady=5, padx=(0, 35))
-
-        self.update_expense_list()
-        self.update_budget_label()
-
-if __name__ == "__main__":
-    app = tk.Tk()
-    budget_manager = BudgetManager(app)
-    app.mainloop()
+import csv
+import tkinter as tk
+from tkinter import messagebox, filedialog
+from datetime import date
+from budget_model import BudgetModel, expense_row
+from charts import ChartsPanel
+from export import EXPENSE_FIELDS, ExportJob, expense_records
+from export_dialog import ask_export_options, watch_export
+from list_selection import delete_rows
+from persistence import PersistenceWorker
+from recurrence_dialog import RecurringPanel
+from schema import report
+from statement_import import iter_expense_batches
+import instrumentation
+
+SAVE_FILE_PATH = "budget_data.json"
+JOURNAL_FILE_PATH = "budget_data.journal"
+
+class BudgetManager:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Budget Manager [v2]")
+        self.root.geometry("400x670")
+        self.root.configure(bg='white')
+
+        self.persistence = PersistenceWorker()
+        self.model = BudgetModel(SAVE_FILE_PATH, JOURNAL_FILE_PATH, self.persistence)
+        self.import_batches = None
+        self.imported_count = 0
+        self.charts = None
+        self.chart_cache = {}
+        self.export_job = None
+        self.recurring_panel = None
+
+        self.load_data()
+        self.create_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def load_data(self):
+        self.model.load()
+        report(self.model.migrations)
+
+    def save_data(self):
+        self.model.save()
+
+    def on_close(self):
+        if self.export_job is not None:
+            self.export_job.cancel()
+        self.model.close()
+        self.persistence.close()
+        self.root.destroy()
+
+    def set_budget(self):
+        budget_input = self.budget_entry.get()
+        if not budget_input:
+            messagebox.showwarning("Missing Input", "Please enter a budget amount.")
+            return
+
+        try:
+            budget = float(budget_input)
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a valid budget amount (numeric value).")
+        else:
+            self.model.set_budget(budget)
+            self.update_budget_label()
+            self.budget_entry.delete(0, tk.END)
+
+    def add_expense(self):
+        expense_name = self.expense_name_entry.get()
+        expense_amount = self.expense_amount_entry.get()
+
+        if not (expense_name and expense_amount):
+            messagebox.showwarning("Missing Input", "Please enter both the expense name and amount.")
+            return
+
+        try:
+            expense_amount = float(expense_amount)
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a valid expense amount (numeric value).")
+        else:
+            self.model.add_expense(expense_name, expense_amount, date.today().toordinal())
+            self.update_expense_list()
+            self.update_budget_label()
+            self.clear_input_fields()
+
+    def remove_expense(self):
+        # Removals are journaled by row index, which would count the imported rows
+        # that are not journaled yet, so nothing is removed while an import runs
+        selected_expense_indices = self.expense_listbox.curselection()
+        if self.import_batches is None and selected_expense_indices:
+            self.model.remove_expenses(selected_expense_indices)
+            delete_rows(self.expense_listbox, selected_expense_indices)
+            self.update_budget_label()
+
+    def clear_all_expenses(self):
+        if self.import_batches is not None:
+            return
+        self.model.clear_expenses()
+        self.update_expense_list()
+        self.update_budget_label()
+
+    def undo(self, event=None):
+        # Steps are not undone while an import is still adding rows
+        if self.import_batches is None and self.model.undo() is not None:
+            self.update_expense_list()
+            self.update_budget_label()
+
+    def redo(self, event=None):
+        if self.import_batches is None and self.model.redo() is not None:
+            self.update_expense_list()
+            self.update_budget_label()
+
+    def import_statement(self):
+        path = filedialog.askopenfilename(title="Import Statement", filetypes=[("Bank statements", "*.csv *.ofx *.qfx"), ("All files", "*.*")])
+        if not path:
+            return
+
+        # Batches are inserted from root.after callbacks so the window stays responsive
+        self.import_batches = iter_expense_batches(path)
+        self.imported_count = 0
+        self.set_import_running(True)
+        self.root.after(0, self.import_next_batch)
+
+    def import_next_batch(self):
+        # The import is finished on any way out that does not schedule the next batch,
+        # errors included, so the buttons it disabled always come back
+        scheduled = False
+        try:
+            batch = next(self.import_batches, None)
+            if batch is not None:
+                names, amounts, days, progress = batch
+                self.model.import_expenses(names, amounts, days)
+                self.imported_count += len(names)
+                self.import_status_label.config(text=f"Importing... {progress:.0%} ({self.imported_count} expenses)")
+                self.root.after(1, self.import_next_batch)
+                scheduled = True
+        except (ValueError, OSError, csv.Error) as error:
+            messagebox.showerror("Import Failed", str(error))
+        finally:
+            if not scheduled:
+                self.finish_import()
+
+    def finish_import(self):
+        self.import_batches = None
+        self.set_import_running(False)
+        self.import_status_label.config(text=f"Imported {self.imported_count} expenses.")
+        self.update_expense_list()
+        self.update_budget_label()
+        # Imported rows are not journaled; they reach disk with one snapshot write
+        if self.imported_count:
+            self.save_data()
+
+    def set_import_running(self, running):
+        state = tk.DISABLED if running else tk.NORMAL
+        for button in (self.import_button, self.remove_expense_button, self.clear_all_expenses_button):
+            button.config(state=state)
+
+    def show_charts(self):
+        if self.charts is not None and self.charts.is_open():
+            self.charts.window.lift()
+            return
+        self.charts = ChartsPanel(self.root, self.model, self.chart_cache)
+
+    def export_expenses(self):
+        options = ask_export_options(self.root, "Export Expenses", date_label="Dated between")
+        if options is None:
+            return
+        # Copies of the columns are taken here, so edits during the export do not show up in it
+        start_day = options["start"].toordinal() if options["start"] else None
+        end_day = options["end"].toordinal() if options["end"] else None
+        records = expense_records(self.model.expenses.columns_snapshot(), start_day, end_day)
+        self.export_job = ExportJob(options["path"], EXPENSE_FIELDS, records, "Expenses", len(self.model.expenses))
+        self.export_button.config(state=tk.DISABLED)
+        watch_export(self.root, self.export_job, self.export_status_label, self.on_export_done)
+
+    def on_export_done(self):
+        self.export_job = None
+        self.export_button.config(state=tk.NORMAL)
+
+    def show_recurring(self):
+        if self.recurring_panel is not None and self.recurring_panel.is_open():
+            self.recurring_panel.window.lift()
+            return
+        self.recurring_panel = RecurringPanel(self.root, self.model.recurring, "Recurring Expenses", amounts=True,
+                                              on_change=self.update_budget_label)
+
+    def refresh_charts(self):
+        if self.charts is not None:
+            self.charts.refresh()
+
+    def update_expense_list(self):
+        self.expense_listbox.delete(0, tk.END)
+        for expense in self.model.expenses:
+            self.expense_listbox.insert(tk.END, expense_row(expense))
+
+    def update_budget_label(self):
+        remaining_budget = self.model.remaining_budget()
+        self.budget_label.config(text=f"Remaining Budget: ${remaining_budget:.2f}")
+        self.refresh_charts()
+
+    def clear_input_fields(self):
+        self.expense_name_entry.delete(0, tk.END)
+        self.expense_amount_entry.delete(0, tk.END)
+
+    def create_ui(self):
+        self.budget_label = tk.Label(self.root, text="Enter Your Budget:", font=("Helvetica", 12), bg='white')
+        self.budget_label.pack(pady=5)
+
+        self.budget_entry = tk.Entry(self.root, font=("Helvetica", 12), width=12, bg='#EAEAEA')
+        self.budget_entry.pack(pady=5)
+
+        set_budget_button = tk.Button(self.root, text="Set Budget", command=self.set_budget, bg='#4CAF50', fg='black', font=("Helvetica", 12))
+        set_budget_button.pack(pady=5)
+
+        expense_name_label = tk.Label(self.root, text="Expense Name:", font=("Helvetica", 12), bg='white')
+        expense_name_label.pack(pady=5)
+
+        self.expense_name_entry = tk.Entry(self.root, font=("Helvetica", 12), width=20, bg='#EAEAEA')
+        self.expense_name_entry.pack(pady=5)
+
+        expense_amount_label = tk.Label(self.root, text="Expense Amount ($):", font=("Helvetica", 12), bg='white')
+        expense_amount_label.pack(pady=5)
+
+        self.expense_amount_entry = tk.Entry(self.root, font=("Helvetica", 12), width=10, bg='#EAEAEA')
+        self.expense_amount_entry.pack(pady=5)
+        
+        add_expense_button = tk.Button(self.root, text="Add Expense", command=self.add_expense, bg='#2196F3', fg='black', font=("Helvetica", 12))
+        add_expense_button.pack(pady=5)
+
+        self.import_button = tk.Button(self.root, text="Import Statement", command=self.import_statement, bg='#9C27B0', fg='black', font=("Helvetica", 12))
+        self.import_button.pack(pady=5)
+
+        self.import_status_label = tk.Label(self.root, text="", font=("Helvetica", 10), bg='white')
+        self.import_status_label.pack()
+
+        history_frame = tk.Frame(self.root, bg='white')
+        history_frame.pack(pady=5)
+
+        undo_button = tk.Button(history_frame, text="Undo", command=self.undo, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        undo_button.pack(side=tk.LEFT, padx=5)
+
+        redo_button = tk.Button(history_frame, text="Redo", command=self.redo, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        redo_button.pack(side=tk.LEFT, padx=5)
+
+        charts_button = tk.Button(history_frame, text="Charts", command=self.show_charts, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        charts_button.pack(side=tk.LEFT, padx=5)
+
+        self.export_button = tk.Button(history_frame, text="Export...", command=self.export_expenses, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.export_button.pack(side=tk.LEFT, padx=5)
+
+        recurring_button = tk.Button(history_frame, text="Recurring", command=self.show_recurring, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        recurring_button.pack(side=tk.LEFT, padx=5)
+
+        self.export_status_label = tk.Label(self.root, text="", font=("Helvetica", 10), bg='white')
+        self.export_status_label.pack()
+
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+
+        self.expense_listbox = tk.Listbox(self.root, selectmode=tk.EXTENDED, font=("Helvetica", 12), width=40, bg='#EAEAEA')
+        self.expense_listbox.pack(pady=5)
+
+        self.remove_expense_button = tk.Button(self.root, text="Remove Expense", command=self.remove_expense, bg='#F44336', fg='black', font=("Helvetica", 12))
+        self.remove_expense_button.pack(side=tk.LEFT, padx=(35, 0))
+
+        self.clear_all_expenses_button = tk.Button(self.root, text="Clear All Expenses", command=self.clear_all_expenses, bg='#FF5722', fg='black', font=("Helvetica", 12))
+        self.clear_all_expenses_button.pack(side=tk.RIGHT, pady=5, padx=(0, 35))
+
+        self.update_expense_list()
+        self.update_budget_label()
+
+if __name__ == "__main__":
+    app = tk.Tk()
+    instrumentation.enable_from_args(app, "budget_manager_v2")
+    budget_manager = BudgetManager(app)
+    app.mainloop()
@@ -1,166 +1,363 @@
-import tkinter as tk
-from tkinter import messagebox, simpledialog
-import json
-
-SAVE_FILE_PATH = "notes_data.json"
-
-class NoteManager:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Personal Note Manager")
-        self.root.geometry("400x540")
-        self.root.configure(bg='white')
-
-        self.note_folders = []
-        self.selected_folder_index = None
-        self.selected_note_index = None
-
-        self.create_ui()
-        self.load_data()
-
-    def load_data(self):
-        try:
-            with open(SAVE_FILE_PATH, "r") as file:
-                data = json.load(file)
-                self.note_folders = data.get("note_folders", [])
-                self.update_folder_list()
-        except FileNotFoundError:
-            pass
-
-    def save_data(self):
-        data = {"note_folders": self.note_folders}
-        with open(SAVE_FILE_PATH, "w") as file:
-            json.dump(data, file)
-
-    def add_folder(self):
-        folder_name = simpledialog.askstring("Create Folder", "Enter folder name:")
-        if folder_name:
-            self.note_folders.append({"name": folder_name, "notes": []})
-            self.update_folder_list()
-            self.save_data()
-
-    def edit_folder(self):
-        if self.selected_folder_index is not None:
-            folder = self.note_folders[self.selected_folder_index]
-            new_name = simpledialog.askstring("Edit Folder", "Edit folder name:", initialvalue=folder["name"])
-            if new_name:
-                folder["name"] = new_name
-                self.update_folder_list()
-                self.save_data()
-
-    def delete_folder(self):
-        if self.selected_folder_index is not None:
-            del self.note_folders[self.selected_folder_index]
-            self.selected_folder_index = None
-            self.update_folder_list()
-            self.save_data()
-
-    def add_note_to_folder(self):
-        if self.selected_folder_index is not None:
-            folder = self.note_folders[self.selected_folder_index]
-            note_text = self.note_entry.get("1.0", tk.END).strip()
-            if note_text:
-                folder["notes"].append(note_text)
-                self.update_note_list(folder)
-                self.clear_input_field()
-                self.save_data()
-
-    def remove_note_from_folder(self):
-        if self.selected_folder_index is not None and self.selected_note_index is not None:
-            folder = self.note_folders[self.selected_folder_index]
-            if len(folder["notes"]) > self.selected_note_index:
-                del folder["notes"][self.selected_note_index]
-                self.selected_note_index = None
-                self.update_note_list(folder)
-                self.save_data()
-
-    def clear_all_notes_from_folder(self):
-        if self.selected_folder_index is not None:
-            folder = self.note_folders[self.selected_folder_index]
-            folder["notes"] = []
-            self.update_note_list(folder)
-            self.save_data()
-
-    def update_folder_list(self):
-        self.folder_listbox.delete(0, tk.END)
-        for folder in self.note_folders:
-            self.folder_listbox.insert(tk.END, folder["name"])
-
-    def update_note_list(self, folder):
-        self.note_listbox.delete(0, tk.END)
-        for note in folder["notes"]:
-            self.note_listbox.insert(tk.END, note)
-
-    def clear_input_field(self):
-        self.note_entry.delete("1.0", tk.END)
-
-    def create_ui(self):
-        self.title_label = tk.Label(self.root, text="Personal Note Manager", font=("Helvetica", 16, "bold"), bg='white')
-        self.title_label.pack(pady=(10,0))
-
-        self.folder_frame = tk.Frame(self.root, bg='white')
-        self.folder_frame.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
-
-        self.folder_label = tk.Label(self.folder_frame, text="Folders:", font=("Helvetica", 12), bg='white')
-        self.folder_label.pack(anchor=tk.W)
-
-        self.folder_listbox = tk.Listbox(self.folder_frame, font=("Helvetica", 12), width=30, height=5, bg='#EAEAEA')
-        self.folder_listbox.pack(pady=5, fill=tk.BOTH, expand=True, side=tk.LEFT)
-
-        folder_buttons_frame = tk.Frame(self.folder_frame, bg='white')
-        folder_buttons_frame.pack(pady=5, padx=5, fill=tk.BOTH, side=tk.LEFT)
-
-        add_folder_button = tk.Button(folder_buttons_frame, text="Add Folder", command=self.add_folder, bg='#2196F3', fg='black', font=("Helvetica", 11))
-        add_folder_button.pack(pady=5, fill=tk.BOTH)
-
-        edit_folder_button = tk.Button(folder_buttons_frame, text="Edit Folder", command=self.edit_folder, bg='#FFC107', fg='black', font=("Helvetica", 11))
-        edit_folder_button.pack(pady=5, fill=tk.BOTH)
-
-        delete_folder_button = tk.Button(folder_buttons_frame, text="Delete Folder", command=self.delete_folder, bg='#F44336', fg='black', font=("Helvetica", 11))
-        delete_folder_button.pack(pady=5, fill=tk.BOTH)
-
-        self.note_frame = tk.Frame(self.root, bg='white')
-        self.note_frame.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
-
-        self.note_label = tk.Label(self.note_frame, text="Enter Your Note:", font=("Helvetica", 12), bg='white')
-        self.note_label.pack(anchor=tk.W)
-
-        self.note_entry = tk.Text(self.note_frame, font=("Helvetica", 12), width=30, height=2, wrap=tk.WORD, bg='#EAEAEA')
-        self.note_entry.pack(pady=5, fill=tk.BOTH, expand=True, side=tk.LEFT)
-
-        note_buttons_frame = tk.Frame(self.note_frame, bg='white')
-        note_buttons_frame.pack(pady=5, padx=5, fill=tk.BOTH, side=tk.LEFT)
-
-        add_note_to_folder_button = tk.Button(note_buttons_frame, text="Add Note", command=self.add_note_to_folder, bg='#2196F3', fg='black', font=("Helvetica", 12))
-        add_note_to_folder_button.pack(pady=5, fill=tk.BOTH)
-
-        self.note_listbox = tk.Listbox(self.root, font=("Helvetica", 12), width=40, height=10, bg='#EAEAEA')
-        self.note_listbox.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
-
-        remove_note_from_folder_button = tk.Button(self.root, text="Remove Note", command=self.remove_note_from_folder, bg='#F44336', fg='black', font=("Helvetica", 12))
-        remove_note_from_folder_button.pack(pady=5, padx=(50,0), fill=tk.BOTH, side=tk.LEFT)
-
-        clear_all_notes_from_folder_button = tk.Button(self.root, text="Clear All Notes", command=self.clear_all_notes_from_folder, bg='#FF5722', fg='black', font=("Helvetica", 12))
-        clear_all_notes_from_folder_button.pack(pady=5, padx=(0,50), fill=tk.BOTH, side=tk.RIGHT)
-
-        self.folder_listbox.bind('<<ListboxSelect>>', self.load_selected_folder)
-        self.note_listbox.bind('<<ListboxSelect>>', self.load_selected_note)
-
-    def load_selected_folder(self, event):
-        selected_folder_index = self.folder_listbox.curselection()
-        if selected_folder_index:
-            index = selected_folder_index[0]
-            folder = self.note_folders[index]
-            self.selected_folder_index = index
-            self.selected_note_index = None
-            self.update_note_list(folder)
-            
-    def load_selected_note(self, event):
-        selected_note_index = self.note_listbox.curselection()
-        if selected_note_index:
-            self.selected_note_index = selected_note_index[0]
-
-if __name__ == "__main__":
-    app = tk.Tk()
-    note_manager = NoteManager(app)
-    app.mainloop()
+import tkinter as tk
+from tkinter import messagebox, simpledialog
+from export import NOTE_FIELDS, ExportJob, note_records
+from export_dialog import ask_export_options, watch_export
+from note_model import NoteModel
+from list_selection import delete_rows
+from persistence import PersistenceWorker
+from schema import report
+import instrumentation
+
+SAVE_FILE_PATH = "notes_data.json"
+DB_FILE_PATH = "notes_data.db"
+INDEX_FILE_PATH = "notes_index.json"
+
+# Maximum number of hits shown for a search
+SEARCH_LIMIT = 100
+
+class NoteManager:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Personal Note Manager")
+        self.root.geometry("400x640")
+        self.root.configure(bg='white')
+
+        self.persistence = PersistenceWorker()
+        self.model = NoteModel(DB_FILE_PATH, SAVE_FILE_PATH, INDEX_FILE_PATH, self.persistence)
+        self.note_folders = self.model.folders
+        self.selected_folder_index = None
+        self.selected_note_index = None
+        self.search_results = None
+        self.export_job = None
+
+        self.create_ui()
+        self.load_data()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def load_data(self):
+        self.model.load()
+        report(self.model.migrations)
+        self.update_folder_list()
+
+    def on_close(self):
+        if self.export_job is not None:
+            self.export_job.cancel()
+        self.model.close()
+        self.persistence.close()
+        self.root.destroy()
+
+    def add_folder(self):
+        folder_name = simpledialog.askstring("Create Folder", "Enter folder name:")
+        if folder_name:
+            self.model.add_folder(folder_name)
+            self.update_folder_list()
+
+    def edit_folder(self):
+        if self.selected_folder_index is not None:
+            folder = self.note_folders[self.selected_folder_index]
+            new_name = simpledialog.askstring("Edit Folder", "Edit folder name:", initialvalue=folder["name"])
+            if new_name:
+                self.model.rename_folder(folder, new_name)
+                self.update_folder_list()
+
+    def delete_folder(self):
+        if self.selected_folder_index is not None:
+            self.model.delete_folder(self.selected_folder_index)
+            self.selected_folder_index = None
+            self.selected_note_index = None
+            self.update_folder_list()
+            # Listed search hits may point into the deleted folder, so the search runs again
+            if self.search_results is not None:
+                self.search_notes()
+            else:
+                self.note_listbox.delete(0, tk.END)
+
+    def add_note_to_folder(self):
+        if self.selected_folder_index is not None:
+            folder = self.note_folders[self.selected_folder_index]
+            note_text = self.note_entry.get("1.0", tk.END).strip()
+            if note_text:
+                self.model.add_note(folder, note_text)
+                self.update_note_list(folder)
+                self.clear_input_field()
+
+    def selected_note_indices(self):
+        # Notes of the open folder picked in the list; none while search hits are listed
+        if self.selected_folder_index is None or self.search_results is not None:
+            return ()
+        return self.note_listbox.curselection()
+
+    def remove_note_from_folder(self):
+        note_indices = self.selected_note_indices()
+        if note_indices:
+            folder = self.model.load_folder_notes(self.note_folders[self.selected_folder_index])
+            self.model.remove_notes(folder, note_indices)
+            self.selected_note_index = None
+            delete_rows(self.note_listbox, note_indices)
+
+    def move_notes_to_folder(self):
+        note_indices = self.selected_note_indices()
+        if not note_indices:
+            return
+        folder = self.model.load_folder_notes(self.note_folders[self.selected_folder_index])
+        target = self.ask_target_folder(folder)
+        if target is not None:
+            self.model.move_notes(folder, note_indices, target)
+            self.selected_note_index = None
+            delete_rows(self.note_listbox, note_indices)
+
+    def copy_notes_to_folder(self):
+        note_indices = self.selected_note_indices()
+        if not note_indices:
+            return
+        folder = self.model.load_folder_notes(self.note_folders[self.selected_folder_index])
+        target = self.ask_target_folder(folder, "Copy")
+        if target is not None:
+            self.model.copy_notes(folder, note_indices, target)
+
+    def ask_target_folder(self, folder, action="Move"):
+        # Small modal list of the other folders; returns the chosen one or None
+        targets = [other for other in self.note_folders if other is not folder]
+        if not targets:
+            messagebox.showinfo(f"{action} Notes", f"Create another folder to {action.lower()} notes into.")
+            return None
+
+        chosen = []
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"{action} Notes")
+        dialog.configure(bg='white')
+        tk.Label(dialog, text=f"{action} to folder:", font=("Helvetica", 12), bg='white').pack(anchor=tk.W, padx=10, pady=(10, 0))
+        listbox = tk.Listbox(dialog, font=("Helvetica", 12), width=30, height=8, bg='#EAEAEA')
+        listbox.pack(padx=10, pady=5)
+        for other in targets:
+            listbox.insert(tk.END, other["name"])
+
+        def choose(event=None):
+            selected = listbox.curselection()
+            if selected:
+                chosen.append(targets[selected[0]])
+                dialog.destroy()
+
+        listbox.bind('<Double-Button-1>', choose)
+        tk.Button(dialog, text=action, command=choose, bg='#2196F3', fg='black', font=("Helvetica", 11)).pack(pady=(0, 10))
+        dialog.transient(self.root)
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return chosen[0] if chosen else None
+
+    def export_notes(self):
+        folder = self.note_folders[self.selected_folder_index] if self.selected_folder_index is not None else None
+        options = ask_export_options(self.root, "Export Notes", folder_name=folder["name"] if folder else None)
+        if options is None:
+            return
+        folder_id = folder["id"] if options["folder_only"] else None
+        # note_count waits for queued writes, so the export thread reads every note saved so far
+        total = self.model.store.note_count(folder_id)
+        self.export_job = ExportJob(options["path"], NOTE_FIELDS, note_records(self.model.store.path, folder_id), "Notes", total)
+        self.export_button.config(state=tk.DISABLED)
+        watch_export(self.root, self.export_job, self.export_status_label, self.on_export_done)
+
+    def on_export_done(self):
+        self.export_job = None
+        self.export_button.config(state=tk.NORMAL)
+
+    def clear_all_notes_from_folder(self):
+        if self.selected_folder_index is not None:
+            folder = self.note_folders[self.selected_folder_index]
+            self.model.clear_folder(folder)
+            self.update_note_list(folder)
+
+    def undo(self, event=None):
+        self.after_history_step(self.model.undo())
+
+    def redo(self, event=None):
+        self.after_history_step(self.model.redo())
+
+    def after_history_step(self, label):
+        # The selected folder stays open if the step did not remove it
+        if label is None:
+            return
+        folder = None
+        if self.selected_folder_index is not None and self.selected_folder_index < len(self.note_folders):
+            folder = self.note_folders[self.selected_folder_index]
+        self.selected_note_index = None
+        self.update_folder_list()
+        if folder is not None:
+            self.folder_listbox.selection_set(self.selected_folder_index)
+            self.update_note_list(self.model.load_folder_notes(folder))
+        else:
+            self.selected_folder_index = None
+            self.search_results = None
+            self.note_listbox.delete(0, tk.END)
+
+    def update_folder_list(self):
+        self.folder_listbox.delete(0, tk.END)
+        for folder in self.note_folders:
+            self.folder_listbox.insert(tk.END, folder["name"])
+
+    def update_note_list(self, folder):
+        self.search_results = None
+        self.note_listbox.delete(0, tk.END)
+        for preview in folder["previews"]:
+            self.note_listbox.insert(tk.END, preview)
+
+    def clear_input_field(self):
+        self.note_entry.delete("1.0", tk.END)
+
+    def search_notes(self, event=None):
+        query = self.search_var.get()
+        if not query.strip():
+            if self.selected_folder_index is not None:
+                self.update_note_list(self.note_folders[self.selected_folder_index])
+            return
+
+        hits = self.model.search(query, SEARCH_LIMIT)
+        self.search_results = [(note_id, folder) for note_id, folder, preview in hits]
+        self.selected_note_index = None
+        self.note_listbox.delete(0, tk.END)
+        for note_id, folder, preview in hits:
+            self.note_listbox.insert(tk.END, f"[{folder['name']}] {preview}")
+        if not self.search_results:
+            self.note_listbox.insert(tk.END, "No matching notes.")
+
+    def open_search_result(self, result_index):
+        if result_index >= len(self.search_results):
+            return
+        note_id, folder = self.search_results[result_index]
+        location = self.model.locate(note_id, folder)
+        if location is None:
+            return
+        folder_index, note_index = location
+
+        self.folder_listbox.selection_clear(0, tk.END)
+        self.folder_listbox.selection_set(folder_index)
+        self.folder_listbox.see(folder_index)
+        self.selected_folder_index = folder_index
+        self.update_note_list(folder)
+        self.note_listbox.selection_set(note_index)
+        self.note_listbox.see(note_index)
+        self.selected_note_index = note_index
+
+    def show_note(self, event=None):
+        # The list only holds previews; the full body is read when a note is opened
+        if self.selected_folder_index is None or self.selected_note_index is None:
+            return
+        folder = self.note_folders[self.selected_folder_index]
+        body = self.model.note_body(folder, self.selected_note_index)
+        if body is None:
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title(folder["name"])
+        window.configure(bg='white')
+        text = tk.Text(window, font=("Helvetica", 12), width=50, height=15, wrap=tk.WORD, bg='#EAEAEA')
+        text.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
+        text.insert("1.0", body)
+        text.configure(state=tk.DISABLED)
+
+    def create_ui(self):
+        self.title_label = tk.Label(self.root, text="Personal Note Manager", font=("Helvetica", 16, "bold"), bg='white')
+        self.title_label.pack(pady=(10,0))
+
+        self.search_frame = tk.Frame(self.root, bg='white')
+        self.search_frame.pack(pady=5, padx=10, fill=tk.X)
+
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(self.search_frame, font=("Helvetica", 12), bg='#EAEAEA', textvariable=self.search_var)
+        self.search_entry.pack(fill=tk.X, expand=True, side=tk.LEFT)
+        self.search_entry.bind('<Return>', self.search_notes)
+
+        search_button = tk.Button(self.search_frame, text="Search", command=self.search_notes, bg='#2196F3', fg='black', font=("Helvetica", 11))
+        search_button.pack(padx=(5,0), side=tk.LEFT)
+
+        undo_button = tk.Button(self.search_frame, text="Undo", command=self.undo, bg='#EAEAEA', fg='black', font=("Helvetica", 11))
+        undo_button.pack(padx=(5,0), side=tk.LEFT)
+
+        redo_button = tk.Button(self.search_frame, text="Redo", command=self.redo, bg='#EAEAEA', fg='black', font=("Helvetica", 11))
+        redo_button.pack(padx=(5,0), side=tk.LEFT)
+
+        self.export_status_label = tk.Label(self.root, text="", font=("Helvetica", 10), bg='white')
+        self.export_status_label.pack()
+
+        self.folder_frame = tk.Frame(self.root, bg='white')
+        self.folder_frame.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+
+        self.folder_label = tk.Label(self.folder_frame, text="Folders:", font=("Helvetica", 12), bg='white')
+        self.folder_label.pack(anchor=tk.W)
+
+        self.folder_listbox = tk.Listbox(self.folder_frame, font=("Helvetica", 12), width=30, height=5, bg='#EAEAEA')
+        self.folder_listbox.pack(pady=5, fill=tk.BOTH, expand=True, side=tk.LEFT)
+
+        folder_buttons_frame = tk.Frame(self.folder_frame, bg='white')
+        folder_buttons_frame.pack(pady=5, padx=5, fill=tk.BOTH, side=tk.LEFT)
+
+        add_folder_button = tk.Button(folder_buttons_frame, text="Add Folder", command=self.add_folder, bg='#2196F3', fg='black', font=("Helvetica", 11))
+        add_folder_button.pack(pady=5, fill=tk.BOTH)
+
+        edit_folder_button = tk.Button(folder_buttons_frame, text="Edit Folder", command=self.edit_folder, bg='#FFC107', fg='black', font=("Helvetica", 11))
+        edit_folder_button.pack(pady=5, fill=tk.BOTH)
+
+        delete_folder_button = tk.Button(folder_buttons_frame, text="Delete Folder", command=self.delete_folder, bg='#F44336', fg='black', font=("Helvetica", 11))
+        delete_folder_button.pack(pady=5, fill=tk.BOTH)
+
+        self.export_button = tk.Button(folder_buttons_frame, text="Export...", command=self.export_notes, bg='#EAEAEA', fg='black', font=("Helvetica", 11))
+        self.export_button.pack(pady=5, fill=tk.BOTH)
+
+        self.note_frame = tk.Frame(self.root, bg='white')
+        self.note_frame.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+
+        self.note_label = tk.Label(self.note_frame, text="Enter Your Note:", font=("Helvetica", 12), bg='white')
+        self.note_label.pack(anchor=tk.W)
+
+        self.note_entry = tk.Text(self.note_frame, font=("Helvetica", 12), width=30, height=2, wrap=tk.WORD, bg='#EAEAEA')
+        self.note_entry.pack(pady=5, fill=tk.BOTH, expand=True, side=tk.LEFT)
+
+        note_buttons_frame = tk.Frame(self.note_frame, bg='white')
+        note_buttons_frame.pack(pady=5, padx=5, fill=tk.BOTH, side=tk.LEFT)
+
+        add_note_to_folder_button = tk.Button(note_buttons_frame, text="Add Note", command=self.add_note_to_folder, bg='#2196F3', fg='black', font=("Helvetica", 12))
+        add_note_to_folder_button.pack(pady=5, fill=tk.BOTH)
+
+        move_notes_button = tk.Button(note_buttons_frame, text="Move Notes", command=self.move_notes_to_folder, bg='#FFC107', fg='black', font=("Helvetica", 12))
+        move_notes_button.pack(pady=5, fill=tk.BOTH)
+
+        copy_notes_button = tk.Button(note_buttons_frame, text="Copy Notes", command=self.copy_notes_to_folder, bg='#FFC107', fg='black', font=("Helvetica", 12))
+        copy_notes_button.pack(pady=5, fill=tk.BOTH)
+
+        self.note_listbox = tk.Listbox(self.root, selectmode=tk.EXTENDED, exportselection=False, font=("Helvetica", 12), width=40, height=10, bg='#EAEAEA')
+        self.note_listbox.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+
+        remove_note_from_folder_button = tk.Button(self.root, text="Remove Note", command=self.remove_note_from_folder, bg='#F44336', fg='black', font=("Helvetica", 12))
+        remove_note_from_folder_button.pack(pady=5, padx=(50,0), fill=tk.BOTH, side=tk.LEFT)
+
+        clear_all_notes_from_folder_button = tk.Button(self.root, text="Clear All Notes", command=self.clear_all_notes_from_folder, bg='#FF5722', fg='black', font=("Helvetica", 12))
+        clear_all_notes_from_folder_button.pack(pady=5, padx=(0,50), fill=tk.BOTH, side=tk.RIGHT)
+
+        self.folder_listbox.bind('<<ListboxSelect>>', self.load_selected_folder)
+        self.note_listbox.bind('<<ListboxSelect>>', self.load_selected_note)
+        self.note_listbox.bind('<Double-Button-1>', self.show_note)
+        self.root.bind('<Control-z>', self.undo)
+        self.root.bind('<Control-y>', self.redo)
+
+    def load_selected_folder(self, event):
+        selected_folder_index = self.folder_listbox.curselection()
+        if selected_folder_index:
+            index = selected_folder_index[0]
+            folder = self.model.load_folder_notes(self.note_folders[index])
+            self.selected_folder_index = index
+            self.selected_note_index = None
+            self.update_note_list(folder)
+            
+    def load_selected_note(self, event):
+        selected_note_index = self.note_listbox.curselection()
+        if selected_note_index:
+            if self.search_results is not None:
+                self.open_search_result(selected_note_index[0])
+                return
+            self.selected_note_index = selected_note_index[0]
+
+if __name__ == "__main__":
+    app = tk.Tk()
+    instrumentation.enable_from_args(app, "note_manager")
+    note_manager = NoteManager(app)
+    app.mainloop()
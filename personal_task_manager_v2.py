@@ -1,154 +1,428 @@
-import tkinter as tk
-from tkinter import messagebox
-import json
-import os
-from tkcalendar import Calendar
-from datetime import datetime
-
-TASKS_FILE_PATH = "tasks.json"
-
-class TaskManager:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Personalized Task Manager")
-        self.root.geometry("400x540")
-        self.root.configure(bg='white')
-
-        self.selected_due_date = ""
-        self.tasks = []
-
-        self.load_tasks()
-        self.create_ui()
-        self.update_task_list()
-
-    def load_tasks(self):
-        if os.path.exists(TASKS_FILE_PATH):
-            with open(TASKS_FILE_PATH, "r") as file:
-                self.tasks = json.load(file)
-
-    def save_tasks(self):
-        with open(TASKS_FILE_PATH, "w") as file:
-            json.dump(self.tasks, file)
-
-    def on_date_select(self, event):
-        selected_date = self.due_date_calendar.get_date()
-        if selected_date:
-            try:
-                selected_date = datetime.strptime(selected_date, "%m/%d/%y")
-                self.selected_due_date = selected_date.strftime("%m/%d/%Y")
-            except ValueError:
-                pass  # Ignore invalid date selections
-
-    def add_task(self):
-        task_text = self.task_var.get()
-
-        if not self.selected_due_date:
-            selected_date = self.due_date_calendar.get_date()
-            if selected_date:
-                try:
-                    selected_date = datetime.strptime(selected_date, "%m/%d/%y")
-                    self.selected_due_date = selected_date.strftime("%m/%d/%Y")
-                except ValueError:
-                    return
-
-        try:
-            due_date = datetime.strptime(self.selected_due_date, "%m/%d/%Y").date()
-        except ValueError:
-            return
-
-        if task_text:
-            task = {
-                "task": task_text,
-                "due_date": due_date.strftime("%m/%d/%Y"),
-                "completed": False,
-                "text_color": "black"
-            }
-            self.tasks.append(task)
-            self.tasks.sort(key=lambda x: x.get("due_date", ""))
-            self.clear_input_fields()
-            self.update_task_list()
-            self.save_tasks()
-        else:
-            messagebox.showwarning("Warning", "Please enter a task.")
-
-    def clear_input_fields(self):
-        self.task_var.set("")
-        self.selected_due_date = ""
-
-    def delete_task(self):
-        selected_task_index = self.task_list.curselection()
-        if selected_task_index:
-            index = selected_task_index[0]
-            del self.tasks[index]
-            self.save_tasks()
-            self.update_task_list()
-
-    def toggle_completed(self, completed):
-        selected_task_index = self.task_list.curselection()
-        if selected_task_index:
-            index = selected_task_index[0]
-            self.tasks[index]["completed"] = completed
-            self.tasks[index]["text_color"] = "gray" if completed else "black"
-            self.update_task_list()
-            self.save_tasks()
-
-    def clear_all_tasks(self):
-        self.tasks = []
-        self.save_tasks()
-        self.update_task_list()
-
-    def update_task_list(self):
-        self.task_list.delete(0, tk.END)
-        for task_data in self.tasks:
-            formatted_task = f"{task_data['due_date']}: {task_data['task']}"
-            text_color = task_data.get("text_color", "black")
-            self.task_list.insert(tk.END, formatted_task)
-            self.task_list.itemconfig(tk.END, {'fg': text_color, 'selectbackground': 'royalblue'})
-
-    def create_ui(self):
-        self.root.grid_columnconfigure(0, weight=1)
-        self.root.grid_columnconfigure(1, weight=1)
-        self.root.grid_rowconfigure(4, weight=1)
-
-        label_spacing = 5
-
-        self.title_label = tk.Label(self.root, text="Personal Task Manager [v2]", font=("Helvetica", 18, "bold"), bg='white')
-        self.title_label.grid(row=0, column=0, columnspan=2, pady=10, padx=10, sticky="w")
-
-        self.task_label = tk.Label(self.root, text="Task:", font=("Helvetica", 12), bg='white')
-        self.task_label.grid(row=1, column=0, pady=label_spacing, padx=10, sticky="e")
-
-        self.task_var = tk.StringVar()
-        self.task_entry = tk.Entry(self.root, width=27, font=("Helvetica", 12), bg='white', textvariable=self.task_var)
-        self.task_entry.grid(row=1, column=1, pady=5, padx=10, sticky="w")
-
-        self.due_date_label = tk.Label(self.root, text="Due Date:", font=("Helvetica", 12), bg='white')
-        self.due_date_label.grid(row=2, column=0, pady=5, padx=10, sticky="e")
-
-        current_time = datetime.now()
-        self.due_date_calendar = Calendar(self.root, selectmode="day", year=current_time.year, month=current_time.month, day=current_time.day)
-        self.due_date_calendar.grid(row=2, column=1, pady=5, padx=10, sticky="w")
-        self.due_date_calendar.bind("<<CalendarSelected>>", self.on_date_select)
-
-        self.add_button = tk.Button(self.root, text="Add Task", command=self.add_task, bg='#4CAF50', fg='black', font=("Helvetica", 12))
-        self.add_button.grid(row=3, column=0, columnspan=2, pady=5, padx=10, sticky="we")
-
-        self.task_list = tk.Listbox(self.root, selectmode=tk.SINGLE, height=8, width=50, bg='#EAEAEA', selectbackground='#4CAF50', selectforeground='white', font=("Helvetica", 12))
-        self.task_list.grid(row=4, column=0, columnspan=2, pady=5, padx=10)
-
-        self.delete_button = tk.Button(self.root, text="Delete Task", command=self.delete_task, bg='#F44336', fg='black', font=("Helvetica", 12))
-        self.delete_button.grid(row=5, column=0, pady=5, padx=10, sticky="w")
-
-        self.clear_all_button = tk.Button(self.root, text="Clear All Tasks", command=self.clear_all_tasks, bg='#FF5722', fg='black', font=("Helvetica", 12))
-        self.clear_all_button.grid(row=5, column=1, pady=5, padx=10, sticky="e")
-
-        self.complete_button = tk.Button(self.root, text="Mark as Complete", command=lambda: self.toggle_completed(True), bg='#2196F3', fg='black', font=("Helvetica", 12))
-        self.complete_button.grid(row=6, column=0, pady=3, padx=10, sticky="w", columnspan=2)
-
-        self.incomplete_button = tk.Button(self.root, text="Mark as Incomplete", command=lambda: self.toggle_completed(False), bg='#FFC107', fg='black', font=("Helvetica", 12))
-        self.incomplete_button.grid(row=6, column=0, columnspan=2, pady=3, padx=10, sticky="e")
-
-if __name__ == "__main__":
-    app = tk.Tk()
-    task_manager = TaskManager(app)
-    app.mainloop()
+import time
+STARTED_AT = time.perf_counter()
+
+import sys
+import threading
+import tkinter as tk
+from tkinter import messagebox
+from datetime import datetime
+from export import TASK_FIELDS, ExportJob, task_records
+from export_dialog import ask_export_options, watch_export
+from task_model import TaskModel, task_row
+from persistence import PersistenceWorker
+from recurrence_dialog import RecurringPanel
+from reminders import ReminderScheduler
+from schema import report
+import instrumentation
+
+IMPORTED_AT = time.perf_counter()
+
+TASKS_FILE_PATH = "tasks.json"
+
+# Number of task rows materialized in the Listbox at any time
+VISIBLE_ROWS = 8
+
+# Milliseconds between checks on the background task loader
+LOAD_POLL_INTERVAL = 20
+
+# Milliseconds between checks for tasks saved by another open task manager
+SYNC_INTERVAL = 2000
+
+# Pass --timing to print import, first-paint and load times to stderr
+SHOW_TIMING = "--timing" in sys.argv
+
+class TaskManager:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Personalized Task Manager")
+        self.root.geometry("400x690")
+        self.root.configure(bg='white')
+
+        self.selected_due_date = ""
+        self.view_offset = 0
+        self.rendered_rows = []
+        # Store indices of the tasks shown while a filter is typed, else None
+        self.filtered = None
+        # Selected tasks, kept by task since the Listbox only holds the visible rows
+        self.selected_tasks = set()
+        self.visible_tasks = []
+        self.persistence = PersistenceWorker()
+        self.tasks = TaskModel(TASKS_FILE_PATH, self.persistence)
+        self.due_date_calendar = None
+        self.loader = None
+        self.export_job = None
+        self.recurring_panel = None
+        self.reminders = ReminderScheduler(self.root, self.on_tasks_overdue)
+
+        # The window is painted before tasks are read; loading runs on a thread
+        self.create_ui()
+        self.update_task_list()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after_idle(self.on_first_paint)
+        self.load_tasks()
+
+    def load_tasks(self):
+        self.set_editing_enabled(False)
+        self.title_label.config(text="Loading tasks...")
+        self.loader = threading.Thread(target=self.tasks.load_in_background, name="task-loader", daemon=True)
+        self.loader.start()
+        self.root.after(LOAD_POLL_INTERVAL, self.poll_loader)
+
+    def poll_loader(self):
+        if self.loader.is_alive():
+            self.root.after(LOAD_POLL_INTERVAL, self.poll_loader)
+            return
+        self.loader = None
+        if self.tasks.load_error is not None:
+            # Editing stays off so nothing is written over the file that failed to load
+            self.title_label.config(text="Tasks could not be loaded")
+            messagebox.showerror("Load Failed", f"{TASKS_FILE_PATH} could not be read, so editing is disabled:\n{self.tasks.load_error}")
+            return
+        report(self.tasks.migrations)
+        self.title_label.config(text="Personal Task Manager [v2]")
+        self.set_editing_enabled(True)
+        self.reminders.track_all(self.tasks)
+        self.refresh_view()
+        self.report_timing("tasks loaded", f"{len(self.tasks)} tasks")
+        self.root.after(SYNC_INTERVAL, self.poll_changes)
+
+    def poll_changes(self):
+        # The file is read on the persistence worker; only the merge happens here
+        if self.tasks.apply_changes():
+            self.refresh_all_tasks()
+        self.tasks.check_changes()
+        self.root.after(SYNC_INTERVAL, self.poll_changes)
+
+    def set_editing_enabled(self, enabled):
+        # Edits made before the file is read would be overwritten by the load
+        state = tk.NORMAL if enabled else tk.DISABLED
+        for button in (self.add_button, self.delete_button, self.clear_all_button, self.complete_button, self.incomplete_button,
+                       self.undo_button, self.redo_button, self.export_button, self.recurring_button):
+            button.config(state=state)
+        # The filter and select-all read the search index, which the loader rebuilds
+        self.filter_entry.config(state=state)
+        if enabled:
+            self.task_list.bind("<Control-a>", self.select_all)
+        else:
+            self.task_list.bind("<Control-a>", lambda event: "break")
+
+    def on_first_paint(self):
+        self.report_timing("imports", None, IMPORTED_AT)
+        self.report_timing("first paint")
+
+    def report_timing(self, stage, detail=None, at=None):
+        if SHOW_TIMING:
+            elapsed = ((at or time.perf_counter()) - STARTED_AT) * 1000
+            print(f"startup: {stage} after {elapsed:.1f} ms" + (f" ({detail})" if detail else ""), file=sys.stderr)
+
+    def show_calendar(self):
+        # tkcalendar is only imported and built the first time a date is picked
+        from tkcalendar import Calendar
+
+        self.due_date_calendar = Calendar(self.root, selectmode="day", date_pattern="mm/dd/yyyy")
+        self.due_date_calendar.bind("<<CalendarSelected>>", self.on_date_select)
+        self.pick_date_button.destroy()
+        self.due_date_calendar.grid(row=2, column=1, pady=5, padx=10, sticky="w")
+
+    def save_tasks(self):
+        self.tasks.save()
+
+    def on_close(self):
+        if self.loader is not None:
+            self.loader.join()
+        if self.export_job is not None:
+            self.export_job.cancel()
+        self.persistence.close()
+        self.root.destroy()
+
+    def on_date_select(self, event):
+        selected_date = self.due_date_calendar.get_date()
+        if selected_date:
+            try:
+                selected_date = datetime.strptime(selected_date, "%m/%d/%Y")
+                self.selected_due_date = selected_date.strftime("%m/%d/%Y")
+            except ValueError:
+                pass  # Ignore invalid date selections
+
+    def add_task(self):
+        task_text = self.task_var.get()
+
+        if not self.selected_due_date and self.due_date_calendar is None:
+            # The calendar starts on today, so an unopened calendar means today
+            self.selected_due_date = datetime.now().strftime("%m/%d/%Y")
+        elif not self.selected_due_date:
+            selected_date = self.due_date_calendar.get_date()
+            if selected_date:
+                try:
+                    selected_date = datetime.strptime(selected_date, "%m/%d/%Y")
+                    self.selected_due_date = selected_date.strftime("%m/%d/%Y")
+                except ValueError:
+                    return
+
+        try:
+            due_date = datetime.strptime(self.selected_due_date, "%m/%d/%Y").date()
+        except ValueError:
+            return
+
+        if task_text:
+            index = self.tasks.add_task(task_text, due_date.strftime("%m/%d/%Y"))
+            self.reminders.track(self.tasks[index])
+            self.clear_input_fields()
+            self.refresh_view()
+        else:
+            messagebox.showwarning("Warning", "Please enter a task.")
+
+    def clear_input_fields(self):
+        self.task_var.set("")
+        self.selected_due_date = ""
+
+    def on_select(self, event=None):
+        selected_rows = set(self.task_list.curselection())
+        for position, task in enumerate(self.visible_tasks):
+            if position in selected_rows:
+                self.selected_tasks.add(task)
+            else:
+                self.selected_tasks.discard(task)
+
+    def select_all(self, event=None):
+        # Selects every task in the view, including rows scrolled out of sight
+        if self.filtered is None:
+            self.selected_tasks = set(self.tasks)
+        else:
+            self.selected_tasks = {self.tasks[index] for index in self.filtered[:]}
+        self.update_task_list()
+        return "break"
+
+    def delete_task(self):
+        indices = self.tasks.indices_of(self.selected_tasks)
+        if indices:
+            for task in self.selected_tasks:
+                self.reminders.untrack(task)
+            self.tasks.delete_tasks(indices)
+            self.selected_tasks.clear()
+            self.refresh_view()
+
+    def toggle_completed(self, completed):
+        indices = self.tasks.indices_of(self.selected_tasks)
+        if indices:
+            self.tasks.set_completed_many(indices, completed)
+            for task in self.selected_tasks:
+                if completed:
+                    self.reminders.untrack(task)
+                else:
+                    self.reminders.track(task)
+            self.update_task_list()
+
+    def clear_all_tasks(self):
+        self.tasks.clear()
+        self.reminders.clear()
+        self.selected_tasks.clear()
+        self.refresh_view()
+
+    def export_tasks(self):
+        options = ask_export_options(self.root, "Export Tasks", date_label="Due between", completed=True)
+        if options is None:
+            return
+        # The list of tasks is taken here; rows are formatted and written on the export thread
+        if options["start"] or options["end"]:
+            tasks = self.tasks.tasks.due_between(options["start"], options["end"])
+        else:
+            tasks = self.tasks.tasks.to_list()
+        self.export_job = ExportJob(options["path"], TASK_FIELDS, task_records(tasks, options["completed"]), "Tasks", len(tasks))
+        self.export_button.config(state=tk.DISABLED)
+        watch_export(self.root, self.export_job, self.export_status_label, self.on_export_done)
+
+    def show_recurring(self):
+        if self.recurring_panel is not None and self.recurring_panel.is_open():
+            self.recurring_panel.window.lift()
+            return
+        self.recurring_panel = RecurringPanel(self.root, self.tasks.recurring, "Recurring Tasks")
+
+    def on_export_done(self):
+        self.export_job = None
+        self.export_button.config(state=tk.NORMAL)
+
+    def undo(self, event=None):
+        if self.loader is None and self.tasks.undo() is not None:
+            self.refresh_all_tasks()
+
+    def redo(self, event=None):
+        if self.loader is None and self.tasks.redo() is not None:
+            self.refresh_all_tasks()
+
+    def refresh_all_tasks(self):
+        # Undo steps and reloads can change any number of tasks, so reminders are rebuilt
+        self.selected_tasks.clear()
+        self.reminders.track_all(self.tasks)
+        self.refresh_view()
+
+    def on_tasks_overdue(self, tasks):
+        # Only visible rows are recolored; the rest pick up the color when scrolled to
+        names = ", ".join(task.task for task in tasks[:3])
+        more = f" and {len(tasks) - 3} more" if len(tasks) > 3 else ""
+        self.reminder_label.config(text=f"Overdue: {names}{more}")
+        self.root.bell()
+        self.update_task_list()
+
+    def format_task_row(self, task_data):
+        formatted_task, text_color = task_row(task_data)
+        if self.reminders.is_overdue(task_data):
+            text_color = "red"
+        return formatted_task, text_color
+
+    def on_filter_changed(self, *args):
+        self.selected_tasks.clear()
+        self.view_offset = 0
+        self.refresh_view()
+
+    def refresh_view(self):
+        # Store indices shift after an edit, so the filter is run again
+        self.filtered = self.tasks.filter(self.filter_var.get())
+        self.update_task_list()
+
+    def view_length(self):
+        return len(self.tasks) if self.filtered is None else len(self.filtered)
+
+    def view_tasks(self, start, stop):
+        if self.filtered is None:
+            return self.tasks[start:stop]
+        return [self.tasks[index] for index in self.filtered[start:stop]]
+
+    def update_task_list(self):
+        # Only the visible window of tasks lives in the Listbox, and only rows whose
+        # text or color changed since the last render are touched.
+        max_offset = max(self.view_length() - VISIBLE_ROWS, 0)
+        self.view_offset = min(self.view_offset, max_offset)
+        self.visible_tasks = self.view_tasks(self.view_offset, self.view_offset + VISIBLE_ROWS)
+        rows = [self.format_task_row(task) for task in self.visible_tasks]
+
+        for position, row in enumerate(rows):
+            if position < len(self.rendered_rows):
+                if self.rendered_rows[position] == row:
+                    continue
+                self.task_list.delete(position)
+            self.task_list.insert(position, row[0])
+            self.task_list.itemconfig(position, {'fg': row[1], 'selectbackground': 'royalblue'})
+        if len(self.rendered_rows) > len(rows):
+            self.task_list.delete(len(rows), tk.END)
+
+        self.rendered_rows = rows
+        self.task_list.selection_clear(0, tk.END)
+        for position, task in enumerate(self.visible_tasks):
+            if task in self.selected_tasks:
+                self.task_list.selection_set(position)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        length = self.view_length()
+        if length:
+            first = self.view_offset / length
+            last = min(self.view_offset + VISIBLE_ROWS, length) / length
+            self.task_scrollbar.set(first, last)
+        else:
+            self.task_scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        max_offset = max(self.view_length() - VISIBLE_ROWS, 0)
+        offset = max(0, min(int(offset), max_offset))
+        if offset != self.view_offset:
+            self.view_offset = offset
+            self.update_task_list()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.view_length())
+        elif action == "scroll":
+            step = VISIBLE_ROWS if unit == "pages" else 1
+            self.scroll_to(self.view_offset + int(amount) * step)
+
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.view_offset - 1)
+        else:
+            self.scroll_to(self.view_offset + 1)
+        return "break"
+
+    def create_ui(self):
+        self.root.grid_columnconfigure(0, weight=1)
+        self.root.grid_columnconfigure(1, weight=1)
+        self.root.grid_rowconfigure(5, weight=1)
+
+        label_spacing = 5
+
+        self.title_label = tk.Label(self.root, text="Personal Task Manager [v2]", font=("Helvetica", 18, "bold"), bg='white')
+        self.title_label.grid(row=0, column=0, columnspan=2, pady=10, padx=10, sticky="w")
+
+        self.task_label = tk.Label(self.root, text="Task:", font=("Helvetica", 12), bg='white')
+        self.task_label.grid(row=1, column=0, pady=label_spacing, padx=10, sticky="e")
+
+        self.task_var = tk.StringVar()
+        self.task_entry = tk.Entry(self.root, width=27, font=("Helvetica", 12), bg='white', textvariable=self.task_var)
+        self.task_entry.grid(row=1, column=1, pady=5, padx=10, sticky="w")
+
+        self.due_date_label = tk.Label(self.root, text="Due Date:", font=("Helvetica", 12), bg='white')
+        self.due_date_label.grid(row=2, column=0, pady=5, padx=10, sticky="e")
+
+        self.pick_date_button = tk.Button(self.root, text="Today (pick a date...)", command=self.show_calendar, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.pick_date_button.grid(row=2, column=1, pady=5, padx=10, sticky="w")
+
+        self.add_button = tk.Button(self.root, text="Add Task", command=self.add_task, bg='#4CAF50', fg='black', font=("Helvetica", 12))
+        self.add_button.grid(row=3, column=0, columnspan=2, pady=5, padx=10, sticky="we")
+
+        self.filter_label = tk.Label(self.root, text="Filter:", font=("Helvetica", 12), bg='white')
+        self.filter_label.grid(row=4, column=0, pady=5, padx=10, sticky="e")
+
+        # The list narrows on every keystroke
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", self.on_filter_changed)
+        self.filter_entry = tk.Entry(self.root, width=27, font=("Helvetica", 12), bg='white', textvariable=self.filter_var)
+        self.filter_entry.grid(row=4, column=1, pady=5, padx=10, sticky="w")
+
+        self.task_list = tk.Listbox(self.root, selectmode=tk.EXTENDED, exportselection=False, height=VISIBLE_ROWS, width=50, bg='#EAEAEA', selectbackground='#4CAF50', selectforeground='white', font=("Helvetica", 12))
+        self.task_list.grid(row=5, column=0, columnspan=2, pady=5, padx=10)
+        self.task_list.bind("<<ListboxSelect>>", self.on_select)
+        self.task_list.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.task_list.bind("<Button-4>", self.on_mouse_wheel)
+        self.task_list.bind("<Button-5>", self.on_mouse_wheel)
+
+        self.task_scrollbar = tk.Scrollbar(self.root, orient=tk.VERTICAL, command=self.on_scroll)
+        self.task_scrollbar.grid(row=5, column=2, pady=5, sticky="ns")
+
+        self.delete_button = tk.Button(self.root, text="Delete Task", command=self.delete_task, bg='#F44336', fg='black', font=("Helvetica", 12))
+        self.delete_button.grid(row=6, column=0, pady=5, padx=10, sticky="w")
+
+        self.clear_all_button = tk.Button(self.root, text="Clear All Tasks", command=self.clear_all_tasks, bg='#FF5722', fg='black', font=("Helvetica", 12))
+        self.clear_all_button.grid(row=6, column=1, pady=5, padx=10, sticky="e")
+
+        self.complete_button = tk.Button(self.root, text="Mark as Complete", command=lambda: self.toggle_completed(True), bg='#2196F3', fg='black', font=("Helvetica", 12))
+        self.complete_button.grid(row=7, column=0, pady=3, padx=10, sticky="w", columnspan=2)
+
+        self.incomplete_button = tk.Button(self.root, text="Mark as Incomplete", command=lambda: self.toggle_completed(False), bg='#FFC107', fg='black', font=("Helvetica", 12))
+        self.incomplete_button.grid(row=7, column=0, columnspan=2, pady=3, padx=10, sticky="e")
+
+        self.reminder_label = tk.Label(self.root, text="", font=("Helvetica", 11), fg='red', bg='white')
+        self.reminder_label.grid(row=8, column=0, columnspan=2, pady=3, padx=10, sticky="w")
+
+        self.undo_button = tk.Button(self.root, text="Undo", command=self.undo, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.undo_button.grid(row=9, column=0, pady=3, padx=10, sticky="w")
+
+        self.redo_button = tk.Button(self.root, text="Redo", command=self.redo, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.redo_button.grid(row=9, column=1, pady=3, padx=10, sticky="e")
+
+        self.recurring_button = tk.Button(self.root, text="Recurring...", command=self.show_recurring, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.recurring_button.grid(row=9, column=0, columnspan=2, pady=3)
+
+        self.export_button = tk.Button(self.root, text="Export...", command=self.export_tasks, bg='#EAEAEA', fg='black', font=("Helvetica", 12))
+        self.export_button.grid(row=10, column=0, pady=3, padx=10, sticky="w")
+
+        self.export_status_label = tk.Label(self.root, text="", font=("Helvetica", 10), bg='white')
+        self.export_status_label.grid(row=10, column=1, pady=3, padx=10, sticky="e")
+
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+
+if __name__ == "__main__":
+    app = tk.Tk()
+    instrumentation.enable_from_args(app, "task_manager_v2")
+    task_manager = TaskManager(app)
+    app.mainloop()
@@ -0,0 +1,219 @@
+"""Recurring tasks and expenses, stored as rules and expanded on demand.
+
+A rule (rent, a subscription, a weekly chore) is stored once with its
+frequency, interval and date range. Occurrences are never written to the task
+or budget files. occurrences() computes the first one inside a window
+arithmetically and walks forward from there, so a rule that has run for ten
+years costs nothing until a window is asked for, and then only the
+occurrences inside it. RecurrenceBook keeps the expansion of recently viewed
+windows until a rule changes.
+"""
+import heapq
+import json
+import os
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime
+from operator import itemgetter
+
+from money import to_cents, to_dollars
+from persistence import write_json_atomic
+from schema import RECURRING, records_of, with_header
+
+DATE_FORMAT = "%m/%d/%Y"
+
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+YEARLY = "yearly"
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY, YEARLY)
+
+# Months between occurrences per interval for calendar-based frequencies
+MONTHS_PER_PERIOD = {MONTHLY: 1, YEARLY: 12}
+
+# Expanded windows kept per book
+WINDOW_CACHE_SIZE = 16
+
+LAST_ORDINAL = date.max.toordinal()
+
+class Rule:
+    """One recurring task or expense.
+
+    start and end are date ordinals; end is None for a rule that runs forever.
+    Monthly and yearly rules keep the day of month of start, moved back to the
+    last day of shorter months (a rule starting Jan 31 falls on Feb 28).
+    amount_cents is 0 for tasks.
+    """
+
+    __slots__ = ("text", "frequency", "interval", "start", "end", "amount_cents")
+
+    def __init__(self, text, frequency, start, interval=1, end=None, amount_cents=0):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {frequency!r}.")
+        if interval < 1:
+            raise ValueError("The interval of a rule must be at least 1.")
+        self.text = text
+        self.frequency = frequency
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.amount_cents = amount_cents
+
+    @classmethod
+    def from_dict(cls, data):
+        end = data.get("end")
+        return cls(data["text"], data["frequency"], date_ordinal(data["start"]), data.get("interval", 1),
+                   date_ordinal(end) if end else None, to_cents(data.get("amount", 0)))
+
+    def to_dict(self):
+        data = {"text": self.text, "frequency": self.frequency, "interval": self.interval,
+                "start": date.fromordinal(self.start).strftime(DATE_FORMAT)}
+        if self.end is not None:
+            data["end"] = date.fromordinal(self.end).strftime(DATE_FORMAT)
+        if self.amount_cents:
+            data["amount"] = to_dollars(self.amount_cents)
+        return data
+
+    def describe(self):
+        unit = {DAILY: "day", WEEKLY: "week", MONTHLY: "month", YEARLY: "year"}[self.frequency]
+        every = f"every {self.interval} {unit}s" if self.interval > 1 else self.frequency
+        until = f" until {date.fromordinal(self.end).strftime(DATE_FORMAT)}" if self.end is not None else ""
+        return f"{every} from {date.fromordinal(self.start).strftime(DATE_FORMAT)}{until}"
+
+def date_ordinal(text):
+    return datetime.strptime(text, DATE_FORMAT).date().toordinal()
+
+def clip(rule, start, end):
+    # The window narrowed to the rule's own date range
+    start = max(start, rule.start)
+    if rule.end is not None:
+        end = min(end, rule.end)
+    return start, end
+
+def day_range(rule, start, end):
+    # Occurrences of a daily or weekly rule inside a window, as a range of ordinals
+    start, end = clip(rule, start, end)
+    step = rule.interval * (7 if rule.frequency == WEEKLY else 1)
+    # First multiple of step on or after start, counted from the rule's start
+    first = rule.start + -(-(start - rule.start) // step) * step
+    return range(first, max(first, end + 1), step)
+
+def occurrences(rule, start, end):
+    """Yields the day ordinals rule falls on from start to end, both included."""
+    if rule.frequency in (DAILY, WEEKLY):
+        yield from day_range(rule, start, end)
+        return
+
+    start, end = clip(rule, start, end)
+    if start > end:
+        return
+
+    step = rule.interval * MONTHS_PER_PERIOD[rule.frequency]
+    anchor = date.fromordinal(rule.start)
+    window_start = date.fromordinal(start)
+    # Periods that end before the window's month are skipped without being generated
+    period = max(0, ((window_start.year - anchor.year) * 12 + window_start.month - anchor.month) // step)
+    while True:
+        months = anchor.month - 1 + period * step
+        year, month = anchor.year + months // 12, months % 12 + 1
+        if year > date.max.year:
+            return
+        day = date(year, month, min(anchor.day, monthrange(year, month)[1])).toordinal()
+        if day > end:
+            return
+        if day >= start:
+            yield day
+        period += 1
+
+def count_occurrences(rule, start, end):
+    # Daily and weekly rules are counted without generating their days
+    if rule.frequency in (DAILY, WEEKLY):
+        return len(day_range(rule, start, end))
+    return sum(1 for day in occurrences(rule, start, end))
+
+def next_occurrence(rule, after):
+    # First occurrence on or after the day ordinal after, or None
+    return next(occurrences(rule, after, LAST_ORDINAL), None)
+
+def tagged(rule, start, end):
+    for day in occurrences(rule, start, end):
+        yield day, rule
+
+class RecurrenceBook:
+    """The recurrence rules of one app, and a cache of expanded windows.
+
+    expand(start, end) returns the (day, rule) occurrences of all rules inside
+    a window in date order, and total_cents(start, end) what they add up to.
+    Both are kept per window, in small caches, until the rules change. With a
+    path the rules are saved as their own JSON file next to the app's data,
+    through the PersistenceWorker when one is given.
+    """
+
+    def __init__(self, path=None, persistence=None):
+        self.path = path
+        self.persistence = persistence
+        self.rules = []
+        self.windows = OrderedDict()
+        self.totals = {}
+
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        self.rules = [Rule.from_dict(record) for record in records_of(data, RECURRING)]
+        self.changed()
+
+    def save(self):
+        if self.path is None:
+            return
+        data = with_header(RECURRING, {"rules": [rule.to_dict() for rule in self.rules]})
+        if self.persistence is not None:
+            self.persistence.save_json(self.path, data)
+        else:
+            write_json_atomic(self.path, data)
+
+    def changed(self):
+        self.windows.clear()
+        self.totals.clear()
+
+    def add_rule(self, rule):
+        self.rules.append(rule)
+        self.changed()
+        self.save()
+
+    def remove_rule(self, rule):
+        self.rules.remove(rule)
+        self.changed()
+        self.save()
+
+    def expand(self, start, end):
+        key = (start, end)
+        expanded = self.windows.get(key)
+        if expanded is not None:
+            self.windows.move_to_end(key)
+            return expanded
+        # Each rule yields in date order, so a merge keeps the window sorted
+        expanded = list(heapq.merge(*(tagged(rule, start, end) for rule in self.rules), key=itemgetter(0)))
+        self.windows[key] = expanded
+        if len(self.windows) > WINDOW_CACHE_SIZE:
+            self.windows.popitem(last=False)
+        return expanded
+
+    def total_cents(self, start, end):
+        # Sum of the amounts of every occurrence in the window, for budget totals.
+        # Occurrences are counted per rule rather than expanded.
+        key = (start, end)
+        if key not in self.totals:
+            if len(self.totals) >= WINDOW_CACHE_SIZE:
+                self.totals.clear()
+            self.totals[key] = sum(rule.amount_cents * count_occurrences(rule, start, end)
+                                   for rule in self.rules if rule.amount_cents)
+        return self.totals[key]
+
+def rules_path(data_path):
+    # tasks.json -> tasks_recurring.json
+    return os.path.splitext(data_path)[0] + "_recurring.json"
@@ -0,0 +1,125 @@
+import tkinter as tk
+from datetime import date, datetime
+from tkinter import messagebox
+
+from money import to_cents
+from recurrence import FREQUENCIES, Rule
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Days ahead covered by the upcoming list
+UPCOMING_DAYS = 30
+
+class RecurringPanel:
+    """Window to add and remove recurrence rules and see what is coming up.
+
+    The upcoming list shows the book's expansion of the next UPCOMING_DAYS
+    days, which the book caches, so refreshing it is free until a rule
+    changes. With amounts=True rules carry an amount (recurring expenses).
+    on_change is called after a rule is added or removed.
+    """
+
+    def __init__(self, root, book, title, amounts=False, on_change=None):
+        self.root = root
+        self.book = book
+        self.amounts = amounts
+        self.on_change = on_change
+        self.shown_rules = []
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.configure(bg='white')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        form = tk.Frame(self.window, bg='white')
+        form.pack(padx=10, pady=(10, 0), anchor=tk.W)
+        tk.Label(form, text="Expense:" if amounts else "Task:", font=("Helvetica", 11), bg='white').grid(row=0, column=0, sticky="e")
+        self.text_entry = tk.Entry(form, font=("Helvetica", 11), width=24, bg='#EAEAEA')
+        self.text_entry.grid(row=0, column=1, columnspan=3, pady=2, sticky="w")
+        if amounts:
+            tk.Label(form, text="Amount ($):", font=("Helvetica", 11), bg='white').grid(row=1, column=0, sticky="e")
+            self.amount_entry = tk.Entry(form, font=("Helvetica", 11), width=10, bg='#EAEAEA')
+            self.amount_entry.grid(row=1, column=1, pady=2, sticky="w")
+
+        tk.Label(form, text="Repeats:", font=("Helvetica", 11), bg='white').grid(row=2, column=0, sticky="e")
+        self.frequency_var = tk.StringVar(value=FREQUENCIES[2])
+        tk.OptionMenu(form, self.frequency_var, *FREQUENCIES).grid(row=2, column=1, pady=2, sticky="w")
+        tk.Label(form, text="every", font=("Helvetica", 11), bg='white').grid(row=2, column=2, padx=5)
+        self.interval_spinbox = tk.Spinbox(form, from_=1, to=365, width=4, font=("Helvetica", 11))
+        self.interval_spinbox.grid(row=2, column=3, sticky="w")
+
+        tk.Label(form, text="From:", font=("Helvetica", 11), bg='white').grid(row=3, column=0, sticky="e")
+        self.start_entry = tk.Entry(form, font=("Helvetica", 11), width=11, bg='#EAEAEA')
+        self.start_entry.insert(0, date.today().strftime(DATE_FORMAT))
+        self.start_entry.grid(row=3, column=1, pady=2, sticky="w")
+        tk.Label(form, text="Until:", font=("Helvetica", 11), bg='white').grid(row=4, column=0, sticky="e")
+        self.end_entry = tk.Entry(form, font=("Helvetica", 11), width=11, bg='#EAEAEA')
+        self.end_entry.grid(row=4, column=1, pady=2, sticky="w")
+        tk.Label(form, text="(blank for no end)", font=("Helvetica", 9), bg='white').grid(row=4, column=2, columnspan=2, sticky="w")
+
+        tk.Button(self.window, text="Add Rule", command=self.add_rule, bg='#2196F3', fg='black', font=("Helvetica", 11)).pack(pady=5)
+
+        tk.Label(self.window, text="Rules:", font=("Helvetica", 12), bg='white').pack(anchor=tk.W, padx=10)
+        self.rule_listbox = tk.Listbox(self.window, font=("Helvetica", 10), width=50, height=6, bg='#EAEAEA')
+        self.rule_listbox.pack(padx=10)
+        tk.Button(self.window, text="Remove Rule", command=self.remove_rule, bg='#F44336', fg='black', font=("Helvetica", 11)).pack(pady=5)
+
+        tk.Label(self.window, text=f"Next {UPCOMING_DAYS} days:", font=("Helvetica", 12), bg='white').pack(anchor=tk.W, padx=10)
+        self.upcoming_listbox = tk.Listbox(self.window, font=("Helvetica", 10), width=50, height=8, bg='#EAEAEA')
+        self.upcoming_listbox.pack(padx=10, pady=(0, 10))
+
+        self.refresh()
+
+    def is_open(self):
+        return self.window is not None
+
+    def close(self):
+        self.window.destroy()
+        self.window = None
+
+    def label(self, rule):
+        return f"{rule.text} (${rule.amount_cents / 100:,.2f})" if self.amounts else rule.text
+
+    def add_rule(self):
+        text = self.text_entry.get().strip()
+        if not text:
+            messagebox.showwarning("Missing Input", "Please enter what repeats.", parent=self.window)
+            return
+        try:
+            amount_cents = to_cents(float(self.amount_entry.get())) if self.amounts else 0
+            interval = int(self.interval_spinbox.get())
+            start = datetime.strptime(self.start_entry.get().strip(), DATE_FORMAT).date().toordinal()
+            end_text = self.end_entry.get().strip()
+            end = datetime.strptime(end_text, DATE_FORMAT).date().toordinal() if end_text else None
+            rule = Rule(text, self.frequency_var.get(), start, interval, end, amount_cents)
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a numeric amount and interval, and dates as MM/DD/YYYY.",
+                                 parent=self.window)
+            return
+        self.book.add_rule(rule)
+        self.text_entry.delete(0, tk.END)
+        if self.amounts:
+            self.amount_entry.delete(0, tk.END)
+        self.changed()
+
+    def remove_rule(self):
+        selected = self.rule_listbox.curselection()
+        if selected:
+            self.book.remove_rule(self.shown_rules[selected[0]])
+            self.changed()
+
+    def changed(self):
+        self.refresh()
+        if self.on_change is not None:
+            self.on_change()
+
+    def refresh(self):
+        self.shown_rules = list(self.book.rules)
+        self.rule_listbox.delete(0, tk.END)
+        for rule in self.shown_rules:
+            self.rule_listbox.insert(tk.END, f"{self.label(rule)}: {rule.describe()}")
+
+        today = date.today().toordinal()
+        self.upcoming_listbox.delete(0, tk.END)
+        for day, rule in self.book.expand(today, today + UPCOMING_DAYS):
+            self.upcoming_listbox.insert(tk.END, f"{date.fromordinal(day).strftime(DATE_FORMAT)}  {self.label(rule)}")
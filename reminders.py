@@ -0,0 +1,100 @@
+import heapq
+import itertools
+from datetime import date, datetime, time
+
+from task_store import UNDATED_KEY, due_date_key
+
+# Longest single timer wait, so clock changes and sleep/resume are picked up
+MAX_WAIT_MS = 60 * 60 * 1000
+
+class ReminderScheduler:
+    """Marks tasks overdue when their due date passes.
+
+    Open tasks sit in a min-heap keyed by due date ordinal, and one root.after
+    timer is armed for the earliest deadline (midnight after the due date).
+    Deleting or completing a task only drops it from the pending set; its stale
+    heap entry is skipped when it reaches the top. on_overdue is called with the
+    list of tasks that just became overdue.
+    """
+
+    def __init__(self, root, on_overdue):
+        self.root = root
+        self.on_overdue = on_overdue
+        self.heap = []
+        self.pending = set()
+        self.overdue = set()
+        self.counter = itertools.count()
+        self.timer = None
+        self.timer_key = None
+
+    def is_overdue(self, task):
+        return task in self.overdue
+
+    def track_all(self, tasks):
+        self.heap = []
+        self.pending = set()
+        self.overdue = set()
+        today = date.today().toordinal()
+        for task in tasks:
+            key = due_date_key(task)
+            if task.completed or key == UNDATED_KEY:
+                continue
+            if key < today:
+                self.overdue.add(task)
+            else:
+                self.heap.append((key, next(self.counter), task))
+                self.pending.add(task)
+        heapq.heapify(self.heap)
+        self.reschedule()
+
+    def track(self, task):
+        key = due_date_key(task)
+        if task.completed or key == UNDATED_KEY or task in self.pending:
+            return
+        if key < date.today().toordinal():
+            self.overdue.add(task)
+            return
+        heapq.heappush(self.heap, (key, next(self.counter), task))
+        self.pending.add(task)
+        if self.timer_key is None or key < self.timer_key:
+            self.reschedule()
+
+    def untrack(self, task):
+        self.pending.discard(task)
+        self.overdue.discard(task)
+
+    def clear(self):
+        self.track_all(())
+
+    def reschedule(self):
+        # Stale entries on top are discarded so the timer targets a live task
+        while self.heap and self.heap[0][2] not in self.pending:
+            heapq.heappop(self.heap)
+
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+            self.timer_key = None
+        if not self.heap:
+            return
+
+        key = self.heap[0][0]
+        deadline = datetime.combine(date.fromordinal(key + 1), time.min)
+        wait = (deadline - datetime.now()).total_seconds() * 1000
+        self.timer_key = key
+        self.timer = self.root.after(max(0, min(int(wait) + 1, MAX_WAIT_MS)), self.fire)
+
+    def fire(self):
+        self.timer = None
+        self.timer_key = None
+        today = date.today().toordinal()
+        became_overdue = []
+        while self.heap and self.heap[0][0] < today:
+            key, count, task = heapq.heappop(self.heap)
+            if task in self.pending:
+                self.pending.discard(task)
+                self.overdue.add(task)
+                became_overdue.append(task)
+        self.reschedule()
+        if became_overdue:
+            self.on_overdue(became_overdue)
@@ -0,0 +1,317 @@
+"""Versioned JSON data files and streaming migrations between versions.
+
+Files written by the apps start with a header naming their schema and version:
+
+    {"schema": "tasks", "version": 2, "tasks": [...]}
+    {"schema": "budget", "version": 2, "budget": 0, "seq": 0, "expenses": [...]}
+    {"schema": "recurring", "version": 1, "rules": [...]}
+
+Files without a header are version 1: a bare task list, the budget object, or
+the old notes_data.json. When a file is older than CURRENT_VERSIONS,
+migrate_file rewrites it record by record. The records array is decoded one
+item at a time from a small read buffer and written out as it goes, so memory
+stays flat however large the file is. Binary snapshots (see snapshot.py) carry
+their own version and are left alone.
+
+    python schema.py tasks.json budget_data.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from file_lock import FileLock
+from task_store import new_task_id
+
+TASKS = "tasks"
+BUDGET = "budget"
+NOTES = "notes"
+RECURRING = "recurring"
+
+LEGACY_VERSION = 1
+# Notes moved from notes_data.json (version 1) to SQLite, where the version is
+# kept in PRAGMA user_version (see note_store.py)
+CURRENT_VERSIONS = {TASKS: 2, BUDGET: 2, NOTES: 3, RECURRING: 1}
+
+# Top-level key holding the records of each kind of file
+RECORDS_KEYS = {TASKS: "tasks", BUDGET: "expenses", NOTES: "note_folders", RECURRING: "rules"}
+
+# Characters read from a file at a time while streaming
+READ_SIZE = 1 << 16
+
+# Rest of the buffer after a decoded value, when it could be more of a number
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Due dates typed into the v1 task manager; two-digit years are tried first so
+# "1/5/24" is not read as the year 24
+LEGACY_DATE_FORMATS = ("%m/%d/%y", "%m/%d/%Y", "%Y-%m-%d", "%m-%d-%Y", "%m.%d.%Y",
+                       "%b %d %Y", "%b %d, %Y", "%B %d %Y", "%B %d, %Y")
+
+@lru_cache(maxsize=4096)
+def normalize_date(text):
+    # Date text in DATE_FORMAT when it can be read as a date, else the text as typed
+    text = text.strip()
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).strftime(DATE_FORMAT)
+        except ValueError:
+            pass
+    return text
+
+def with_header(kind, fields):
+    return {"schema": kind, "version": CURRENT_VERSIONS[kind], **fields}
+
+def records_of(data, kind):
+    # The records of a loaded file of either version
+    if isinstance(data, list):
+        return data
+    return data.get(RECORDS_KEYS[kind], [])
+
+class JsonStream:
+    """Pull parser over one JSON document, a value at a time.
+
+    Only the structure the caller walks through (objects with keys(), arrays
+    with items()) is parsed incrementally; every value taken with value() is
+    decoded whole, so it should be a record, not the big array.
+    """
+
+    def __init__(self, file, read_size=READ_SIZE):
+        self.file = file
+        self.read_size = read_size
+        self.buffer = ""
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        # Drops the consumed text and reads more; False at end of file
+        chunk = self.file.read(self.read_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return bool(chunk)
+
+    def peek(self):
+        # Next non-whitespace character, or "" at end of file
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n":
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError(f"expected {character!r} in JSON data")
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next chunk ("2." then "5")
+            if NUMBER_TAIL.match(self.buffer, end) and self.fill():
+                continue
+            self.position = end
+            return value
+
+    def separator(self, closing):
+        # Consumes "," or the closing bracket; True at the closing bracket
+        character = self.peek()
+        self.position += 1
+        if character == closing:
+            return True
+        if character != ",":
+            raise ValueError(f"expected ',' or {closing!r} in JSON data")
+        return False
+
+    def items(self):
+        # Values of the array starting here, one at a time
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self.separator("]"):
+                return
+
+    def keys(self):
+        # Keys of the object starting here; the caller reads each key's value
+        # (with value() or items()) before asking for the next key
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.separator("}"):
+                return
+
+def read_header(path):
+    """Returns (kind, version) of a JSON data file.
+
+    kind is None for a missing file or one that is not JSON (a binary snapshot).
+    """
+    try:
+        with open(path, "rb") as file:
+            start = file.read(64).lstrip()[:1]
+    except FileNotFoundError:
+        return None, None
+    if start == b"[":
+        return TASKS, LEGACY_VERSION
+    if start != b"{":
+        return None, None
+
+    with open(path, "r") as file:
+        stream = JsonStream(file, 4096)
+        kind = None
+        for key in stream.keys():
+            if key == "schema":
+                kind = stream.value()
+            elif key == "version" and kind is not None:
+                return kind, stream.value()
+            else:
+                # Version 1 files have no header
+                return kind or (NOTES if key == "note_folders" else BUDGET), LEGACY_VERSION
+    return kind or BUDGET, LEGACY_VERSION
+
+class MigrationStats:
+    def __init__(self, path, kind, from_version, to_version, records, size, seconds):
+        self.path = path
+        self.kind = kind
+        self.from_version = from_version
+        self.to_version = to_version
+        self.records = records
+        self.size = size
+        self.seconds = seconds
+
+    def records_per_second(self):
+        return self.records / self.seconds if self.seconds else float("inf")
+
+    def __str__(self):
+        rate = f"{self.records_per_second():,.0f} records/s"
+        if self.size and self.seconds:
+            rate += f", {self.size / self.seconds / 1e6:.1f} MB/s"
+        return (f"migrated {self.path} ({self.kind}) from version {self.from_version} to {self.to_version}: "
+                f"{self.records:,} records in {self.seconds:.2f} s ({rate})")
+
+def report(migrations):
+    # Migrations are rare and can take a while on big files, so they are always logged
+    for stats in migrations:
+        print(stats, file=sys.stderr)
+
+def upgrade_task_v1(record):
+    # Version 1 lists got ids lazily, and the v1 app stored due dates as typed
+    record = dict(record)
+    if record.get("id") is None:
+        record["id"] = new_task_id()
+    record["due_date"] = normalize_date(record.get("due_date") or "")
+    record["completed"] = bool(record.get("completed", False))
+    return record
+
+def upgrade_expense_v1(row):
+    # Version 1 rows may have string amounts and dates in other formats
+    upgraded = [str(row[0]), float(row[1])]
+    if len(row) > 2 and row[2]:
+        upgraded.append(normalize_date(row[2]))
+    return upgraded
+
+# Record upgrades by kind; MIGRATIONS[kind][n] takes a record from version n + 1 to n + 2
+MIGRATIONS = {
+    TASKS: [upgrade_task_v1],
+    BUDGET: [upgrade_expense_v1],
+}
+
+def migrate_file(path, kind=None):
+    """Rewrites path at the current version of its kind, streaming record by record.
+
+    Returns MigrationStats, or None when the file is missing, not JSON or
+    already current. Callers hold the file's FileLock when other processes may
+    be using it.
+    """
+    found_kind, version = read_header(path)
+    if found_kind is None or found_kind not in MIGRATIONS:
+        return None
+    if kind is not None and found_kind != kind:
+        raise ValueError(f"{path} holds {found_kind} data, not {kind}")
+    current = CURRENT_VERSIONS[found_kind]
+    if version == current:
+        return None
+    if version > current:
+        raise ValueError(f"{path} is version {version}, newer than this app supports ({current})")
+
+    steps = MIGRATIONS[found_kind][version - LEGACY_VERSION:]
+    records_key = RECORDS_KEYS[found_kind]
+    started = time.perf_counter()
+    count = 0
+    temp_path = path + ".migrating"
+    try:
+        with open(path, "r") as source, open(temp_path, "w") as target:
+            stream = JsonStream(source)
+
+            def copy_records():
+                nonlocal count
+                target.write(f", {json.dumps(records_key)}: [")
+                for record in stream.items():
+                    try:
+                        for step in steps:
+                            record = step(record)
+                    except (ValueError, TypeError, KeyError, IndexError) as error:
+                        raise ValueError(f"{path}: record {count + 1} could not be upgraded from version {version}: "
+                                         f"{error} ({json.dumps(record)[:200]})") from error
+                    target.write((", " if count else "") + json.dumps(record))
+                    count += 1
+                target.write("]")
+
+            # The header goes first; other top-level keys keep their order around the records
+            header = json.dumps({"schema": found_kind, "version": current})
+            target.write(header[:-1])
+            if stream.peek() == "[":
+                copy_records()
+            else:
+                for key in stream.keys():
+                    if key == records_key and stream.peek() == "[":
+                        copy_records()
+                    elif key in ("schema", "version"):
+                        stream.value()
+                    else:
+                        target.write(f", {json.dumps(key)}: {json.dumps(stream.value())}")
+            target.write("}")
+            target.flush()
+            os.fsync(target.fileno())
+        size = os.path.getsize(path)
+        os.replace(temp_path, path)
+    except BaseException:
+        # The original file is untouched; only the partial copy is removed
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return MigrationStats(path, found_kind, version, current, count, size, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade task and budget data files to the current schema version.")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+    for path in args.paths:
+        # The write counter is bumped so open task managers reload the file
+        with FileLock(path) as lock:
+            stats = migrate_file(path)
+            if stats is not None:
+                lock.write_seq(lock.read_seq() + 1)
+        print(stats if stats is not None else f"{path} is already current")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Compact binary snapshots for the task list and the budget ledger.
+
+Layout (little-endian):
+    header   magic "BPSN", u16 version, u8 kind, pad, u64 record count, u64 string count
+    budget   f64 budget, i64 seq                      (budget snapshots only)
+    strings  i64 length (in characters) per string, u64 byte size, UTF-8 blob
+    columns  one fixed-width array per field, record count entries each
+
+Strings are interned: each distinct task text, due date or expense name is
+stored once and records refer to it by position. Files are detected by their
+magic bytes, so JSON and binary files can be loaded by the same code, and
+either can be converted to the other without loss:
+
+    python snapshot.py tasks.json --to binary
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+from file_lock import FileLock
+from money import load_numpy
+from persistence import write_json_atomic
+import schema
+from task_store import Task
+
+MAGIC = b"BPSN"
+VERSION = 1
+TASKS = 1
+BUDGET = 2
+
+HEADER = struct.Struct("<4sHBxQQ")
+BUDGET_HEADER = struct.Struct("<dq")
+SIZE = struct.Struct("<Q")
+
+def is_snapshot(path):
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+def column_bytes(typecode, values):
+    column = values if isinstance(values, array) else array(typecode, values)
+    if sys.byteorder == "big":
+        column = array(typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def read_column(data, offset, typecode, count):
+    column = array(typecode)
+    size = column.itemsize * count
+    column.frombytes(data[offset:offset + size])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, offset + size
+
+def string_table_bytes(strings):
+    blob = "".join(strings).encode("utf-8")
+    return column_bytes("q", map(len, strings)) + SIZE.pack(len(blob)) + blob
+
+def read_string_table(data, offset, count):
+    lengths, offset = read_column(data, offset, "q", count)
+    (size,) = SIZE.unpack_from(data, offset)
+    offset += SIZE.size
+    text = data[offset:offset + size].decode("utf-8")
+    ends = list(accumulate(lengths))
+    starts = [0] + ends[:-1]
+    return [text[start:end] for start, end in zip(starts, ends)], offset + size
+
+def write_atomic(path, parts):
+    # Same temp-file-and-replace scheme as persistence.write_json_atomic
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.writelines(parts)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def read_header(data, kind):
+    magic, version, found_kind, records, strings = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or found_kind != kind:
+        raise ValueError("not a snapshot of the expected kind")
+    if version > VERSION:
+        raise ValueError(f"snapshot version {version} is newer than this app supports ({VERSION})")
+    return records, strings, HEADER.size
+
+def write_tasks(path, tasks):
+    strings, positions = [], {}
+
+    def intern(text):
+        position = positions.get(text)
+        if position is None:
+            position = positions[text] = len(strings)
+            strings.append(text)
+        return position
+
+    ids, texts, due_dates, completed = array("q"), array("q"), array("q"), array("b")
+    for task in tasks:
+        ids.append(task.id)
+        texts.append(intern(task.task))
+        due_dates.append(intern(task.due_date))
+        completed.append(bool(task.completed))
+
+    write_atomic(path, [HEADER.pack(MAGIC, VERSION, TASKS, len(ids), len(strings)), string_table_bytes(strings),
+                        column_bytes("q", ids), column_bytes("q", texts), column_bytes("q", due_dates),
+                        column_bytes("b", completed)])
+
+def read_tasks(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    count, string_count, offset = read_header(data, TASKS)
+    strings, offset = read_string_table(data, offset, string_count)
+    ids, offset = read_column(data, offset, "q", count)
+    texts, offset = read_column(data, offset, "q", count)
+    due_dates, offset = read_column(data, offset, "q", count)
+    completed, offset = read_column(data, offset, "b", count)
+    return [Task(strings[text], strings[due_date], bool(done), task_id)
+            for task_id, text, due_date, done in zip(ids, texts, due_dates, completed)]
+
+def write_budget(path, budget, seq, columns):
+    # columns is ExpenseStore.columns_snapshot(): (name_table, codes, amounts, days)
+    name_table, codes, amounts, days = columns
+    np = load_numpy()
+    if np is not None and not isinstance(amounts, array):
+        column_parts = [np.asarray(codes, dtype="<i8").tobytes(), np.asarray(amounts, dtype="<f8").tobytes(),
+                        np.asarray(days, dtype="<i8").tobytes()]
+    else:
+        column_parts = [column_bytes("q", codes), column_bytes("d", amounts), column_bytes("q", days)]
+    write_atomic(path, [HEADER.pack(MAGIC, VERSION, BUDGET, len(codes), len(name_table)),
+                        BUDGET_HEADER.pack(budget, seq), string_table_bytes(name_table)] + column_parts)
+
+def read_budget(path):
+    # Returns (budget, seq, ExpenseStore). The budget side, and NumPy with it, is
+    # imported here so task_model can use this module without loading either.
+    from expense_store import ExpenseStore
+
+    np = load_numpy()
+    with open(path, "rb") as file:
+        data = file.read()
+    count, string_count, offset = read_header(data, BUDGET)
+    budget, seq = BUDGET_HEADER.unpack_from(data, offset)
+    offset += BUDGET_HEADER.size
+    name_table, offset = read_string_table(data, offset, string_count)
+    if np is not None:
+        codes = np.frombuffer(data, dtype="<i8", count=count, offset=offset)
+        amounts = np.frombuffer(data, dtype="<f8", count=count, offset=offset + 8 * count)
+        days = np.frombuffer(data, dtype="<i8", count=count, offset=offset + 16 * count)
+    else:
+        codes, offset = read_column(data, offset, "q", count)
+        amounts, offset = read_column(data, offset, "d", count)
+        days, offset = read_column(data, offset, "q", count)
+    return budget, seq, ExpenseStore.from_columns(name_table, codes, amounts, days)
+
+def convert(path, to):
+    # Rewrites path in the other format, keeping every field. The write counter
+    # is bumped so open task managers notice the change.
+    with FileLock(path) as lock:
+        convert_file(path, to)
+        lock.write_seq(lock.read_seq() + 1)
+
+def convert_file(path, to):
+    if to == "binary":
+        # Binary snapshots hold current records only, so older JSON is upgraded first
+        schema.migrate_file(path)
+        with open(path, "r") as file:
+            data = json.load(file)
+        if data["schema"] == schema.TASKS:
+            write_tasks(path, [Task.from_dict(record) for record in schema.records_of(data, schema.TASKS)])
+        else:
+            from expense_store import ExpenseStore
+
+            expenses = ExpenseStore(data.get("expenses", []))
+            write_budget(path, data.get("budget", 0), data.get("seq", 0), expenses.columns_snapshot())
+        return
+
+    with open(path, "rb") as file:
+        kind = HEADER.unpack_from(file.read(HEADER.size))[2]
+    if kind == TASKS:
+        data = schema.with_header(schema.TASKS, {"tasks": [task.to_dict() for task in read_tasks(path)]})
+    else:
+        budget, seq, expenses = read_budget(path)
+        data = schema.with_header(schema.BUDGET, {"budget": budget, "expenses": expenses.to_list(), "seq": seq})
+    write_json_atomic(path, data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a tasks or budget file between JSON and binary snapshots.")
+    parser.add_argument("path")
+    parser.add_argument("--to", choices=("binary", "json"), required=True)
+    args = parser.parse_args()
+    if is_snapshot(args.path) == (args.to == "binary"):
+        print(f"{args.path} is already {args.to}")
+        return
+    convert(args.path, args.to)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from datetime import date
+
+from expense_store import UNDATED
+from money import cents_column, to_cents, to_dollars
+
+def month_of(day):
+    if day == UNDATED:
+        return None
+    day = date.fromordinal(day)
+    return (day.year, day.month)
+
+def adjust(totals, key, cents):
+    total = totals.get(key, 0) + cents
+    if total:
+        totals[key] = total
+    else:
+        totals.pop(key, None)
+
+class SpendingBuckets:
+    """Spending totals by month and by expense name, kept up to date per edit.
+
+    Totals are integer cents, like ExpenseStore's amounts, so a bucket whose
+    expenses are all removed goes back to exactly zero and is dropped.
+    Month keys are (year, month) tuples, or None for undated expenses, as in
+    ExpenseStore.totals_by_month. Each kind of bucket has a version that goes
+    up whenever it changes, so charts built from it can be cached until then.
+    """
+
+    def __init__(self):
+        self.by_month = {}
+        self.by_name = {}
+        self.versions = {"months": 0, "names": 0}
+
+    def changed(self):
+        self.versions["months"] += 1
+        self.versions["names"] += 1
+
+    def rebuild(self, expenses):
+        # Full recount from an ExpenseStore, after loading or swapping stores
+        self.by_month = expenses.cents_by_month()
+        self.by_name = expenses.cents_by_name()
+        self.changed()
+
+    def clear(self):
+        self.by_month = {}
+        self.by_name = {}
+        self.changed()
+
+    def add(self, name, amount, day):
+        cents = to_cents(amount)
+        adjust(self.by_month, month_of(day), cents)
+        adjust(self.by_name, name, cents)
+        self.changed()
+
+    def remove(self, name, amount, day):
+        self.add(name, -amount, day)
+
+    def add_columns(self, names, amounts, days):
+        for name, cents, day in zip(names, cents_column(amounts), days):
+            adjust(self.by_month, month_of(int(day)), int(cents))
+            adjust(self.by_name, name, int(cents))
+        self.changed()
+
+    def month_dollars(self):
+        # Copies of the buckets in dollars, for the charts
+        return {month: to_dollars(cents) for month, cents in self.by_month.items()}
+
+    def name_dollars(self):
+        return {name: to_dollars(cents) for name, cents in self.by_name.items()}
@@ -0,0 +1,161 @@
+import csv
+import os
+import re
+from datetime import datetime
+
+from expense_store import UNDATED
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows parsed and inserted per batch
+CHUNK_SIZE = 5000
+
+NAME_COLUMNS = ("description", "name", "payee", "merchant", "memo", "details")
+AMOUNT_COLUMNS = ("amount", "transaction amount", "value")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "money out")
+DATE_COLUMNS = ("date", "posted date", "transaction date", "posting date")
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%y", "%Y%m%d")
+
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+class StatementChunk:
+    def __init__(self):
+        self.names = []
+        self.amounts = []
+        self.dates = []
+        # File offset reached after this chunk, for progress reporting
+        self.position = 0
+
+    def __len__(self):
+        return len(self.names)
+
+def find_column(header, candidates):
+    for candidate in candidates:
+        if candidate in header:
+            return header.index(candidate)
+    return None
+
+def iter_csv_chunks(file, chunk_size=CHUNK_SIZE):
+    # readline keeps file.tell() usable for progress, unlike iterating the file
+    reader = csv.reader(iter(file.readline, ""))
+    header = [column.strip().lower() for column in next(reader, [])]
+    name_column = find_column(header, NAME_COLUMNS)
+    debit_column = find_column(header, DEBIT_COLUMNS)
+    amount_column = find_column(header, AMOUNT_COLUMNS)
+    date_column = find_column(header, DATE_COLUMNS)
+    if name_column is None or (debit_column is None and amount_column is None):
+        raise ValueError("CSV needs a description column and an amount or debit column.")
+
+    # A signed amount column reports spending as negative values
+    signed = debit_column is None
+    value_column = amount_column if signed else debit_column
+
+    chunk = StatementChunk()
+    for row in reader:
+        if len(row) <= max(name_column, value_column):
+            continue
+        chunk.names.append(row[name_column].strip())
+        chunk.amounts.append(negate(row[value_column]) if signed else row[value_column])
+        chunk.dates.append(row[date_column] if date_column is not None and date_column < len(row) else "")
+        if len(chunk) >= chunk_size:
+            chunk.position = file.tell()
+            yield chunk
+            chunk = StatementChunk()
+    chunk.position = file.tell()
+    yield chunk
+
+def negate(text):
+    text = text.strip()
+    if text.startswith("-"):
+        return text[1:]
+    if text.startswith("(") and text.endswith(")"):
+        return text[1:-1]
+    return "-" + text if text else text
+
+def iter_ofx_chunks(file, chunk_size=CHUNK_SIZE):
+    # Reads <STMTTRN> blocks line by line; works for both SGML and XML flavoured OFX
+    chunk = StatementChunk()
+    transaction = None
+    for line in iter(file.readline, ""):
+        for tag, value in OFX_FIELD.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                transaction = {}
+            elif transaction is not None and value.strip():
+                transaction.setdefault(tag, value.strip())
+        if transaction is not None and "</STMTTRN>" in line.upper():
+            chunk.names.append(transaction.get("NAME") or transaction.get("MEMO", ""))
+            chunk.amounts.append(negate(transaction.get("TRNAMT", "")))
+            chunk.dates.append(transaction.get("DTPOSTED", "")[:8])
+            transaction = None
+            if len(chunk) >= chunk_size:
+                chunk.position = file.tell()
+                yield chunk
+                chunk = StatementChunk()
+    chunk.position = file.tell()
+    yield chunk
+
+def parse_amounts(texts):
+    # Strips currency symbols and grouping, turns "(12.50)" into -12.50, and
+    # parses the whole chunk at once; unparseable amounts become NaN
+    cleaned = [re.sub(r"[^\d.\-()]", "", text).replace("(", "-").replace(")", "") for text in texts]
+    if np is not None:
+        values = np.full(len(cleaned), np.nan)
+        try:
+            values[:] = np.array(cleaned, dtype="U32").astype(np.float64)
+        except ValueError:
+            for index, text in enumerate(cleaned):
+                values[index] = to_float(text)
+        return values
+    return [to_float(text) for text in cleaned]
+
+def to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
+
+def parse_days(texts, cache):
+    # Statements repeat the same few dates, so each distinct string is parsed once
+    days = []
+    for text in texts:
+        day = cache.get(text)
+        if day is None:
+            day = cache[text] = parse_statement_date(text)
+        days.append(day)
+    return days
+
+def parse_statement_date(text):
+    text = text.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().toordinal()
+        except ValueError:
+            pass
+    return UNDATED
+
+def iter_expense_batches(path, chunk_size=CHUNK_SIZE):
+    """Yields (names, amounts, days, fraction_done) batches of spending rows.
+
+    Only outflows are kept: positive debit values, or negative signed amounts.
+    Memory use is bounded by chunk_size regardless of the file size.
+    """
+    size = os.path.getsize(path) or 1
+    is_ofx = os.path.splitext(path)[1].lower() in (".ofx", ".qfx")
+    date_cache = {}
+    with open(path, "r", newline="", encoding="utf-8-sig", errors="replace") as file:
+        chunks = iter_ofx_chunks(file, chunk_size) if is_ofx else iter_csv_chunks(file, chunk_size)
+        for chunk in chunks:
+            amounts = parse_amounts(chunk.amounts)
+            days = parse_days(chunk.dates, date_cache)
+            if np is not None:
+                keep = np.flatnonzero(amounts > 0)
+                names = [chunk.names[index] for index in keep]
+                yield names, amounts[keep], np.array(days, dtype=np.int64)[keep], chunk.position / size
+            else:
+                keep = [index for index, amount in enumerate(amounts) if amount > 0]
+                yield ([chunk.names[index] for index in keep], [amounts[index] for index in keep],
+                       [days[index] for index in keep], chunk.position / size)
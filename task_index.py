@@ -0,0 +1,65 @@
+from bisect import bisect_left, insort
+
+from note_index import tokenize
+
+class TaskTextIndex:
+    """Word-prefix index over task text for search-as-you-type.
+
+    postings maps each word to the set of Task objects containing it, and words
+    keeps the vocabulary sorted, so every word starting with a typed prefix is
+    one bisect away (a flattened trie). A query matches tasks that have, for
+    each query word, some word starting with it.
+    """
+
+    def __init__(self, tasks=()):
+        self.rebuild(tasks)
+
+    def rebuild(self, tasks):
+        # One sort for the whole vocabulary instead of an insort per new word
+        self.postings = {}
+        for task in tasks:
+            for word in set(tokenize(task.task)):
+                self.postings.setdefault(word, set()).add(task)
+        self.words = sorted(self.postings)
+
+    def add(self, task):
+        for word in set(tokenize(task.task)):
+            tasks = self.postings.get(word)
+            if tasks is None:
+                tasks = self.postings[word] = set()
+                insort(self.words, word)
+            tasks.add(task)
+
+    def remove(self, task):
+        for word in set(tokenize(task.task)):
+            tasks = self.postings.get(word)
+            if tasks is None:
+                continue
+            tasks.discard(task)
+            if not tasks:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+
+    def prefix_matches(self, prefix):
+        position = bisect_left(self.words, prefix)
+        found = []
+        while position < len(self.words) and self.words[position].startswith(prefix):
+            found.append(self.postings[self.words[position]])
+            position += 1
+        if len(found) == 1:
+            return found[0]
+        return set().union(*found)
+
+    def matches(self, query):
+        # Returns the set of matching tasks, or None when the query has no words
+        prefixes = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not prefixes:
+            return None
+        # Longer prefixes usually match fewer tasks, so they go first
+        result = None
+        for prefix in prefixes:
+            tasks = self.prefix_matches(prefix)
+            result = set(tasks) if result is None else result & tasks
+            if not result:
+                break
+        return result
@@ -0,0 +1,404 @@
+import json
+import threading
+from itertools import compress
+from task_store import Task, TaskStore, task_to_json
+from file_lock import FileLock
+from history import History
+from task_index import TaskTextIndex
+from persistence import write_json_atomic
+from recurrence import RecurrenceBook, rules_path
+from schema import TASKS, migrate_file, records_of, with_header
+from snapshot import is_snapshot, read_tasks, write_tasks
+
+def new_task(task_text, due_date):
+    return Task(task_text, due_date)
+
+def task_row(task_data):
+    # Listbox text and color used by the v2 task manager
+    return f"{task_data.due_date}: {task_data.task}", task_data.text_color
+
+def padded_task_row(task_data):
+    # Listbox text and color used by the v1 task manager
+    formatted_task = task_data.task + task_data.due_date.rjust(45 - len(task_data.task), ' ')
+    return formatted_task, task_data.text_color
+
+# Tasks adopted one by one from another instance's write; more are rebuilt in one pass
+INCREMENTAL_RELOAD_LIMIT = 64
+
+def read_records(path):
+    # Task dicts from either a JSON file or a binary snapshot
+    if is_snapshot(path):
+        return [task.to_dict() for task in read_tasks(path)]
+    try:
+        with open(path, "r") as file:
+            return records_of(json.load(file), TASKS)
+    except FileNotFoundError:
+        return []
+
+def write_tasks_file(path, tasks):
+    # Keeps whatever format the file is already in; new files are JSON
+    if is_snapshot(path):
+        write_tasks(path, tasks)
+    else:
+        write_json_atomic(path, with_header(TASKS, {"tasks": tasks}), task_to_json)
+
+def merge_changes(records, changes):
+    # Applies buffered (mark, op, value) changes, in order, to task dicts read from disk
+    by_id = {record.get("id"): record for record in records}
+    for mark, op, value in changes:
+        if op == "put":
+            by_id[value["id"]] = value
+        elif op == "delete":
+            by_id.pop(value, None)
+        elif op == "clear":
+            by_id.clear()
+    return list(by_id.values())
+
+# Tasks checked per step when a filtered view is scanned for more matches
+FILTER_SCAN_CHUNK = 2048
+
+class FilteredTasks:
+    """Store indices of the tasks in matches, in list order, found on demand.
+
+    The length is known from the match set alone, and the store is only
+    scanned as far as the rows asked for, so a broad filter over a long list
+    costs a scan of the first screenful rather than of every task. Like a
+    plain index list it goes stale once the store changes.
+    """
+
+    def __init__(self, store, matches):
+        self.store = store
+        self.matches = matches
+        self.indices = []
+        self.scanned = 0
+
+    def __len__(self):
+        return len(self.matches)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            stop = key.stop if key.stop is not None and key.stop >= 0 else len(self)
+        else:
+            stop = key + 1 if key >= 0 else len(self)
+        self.scan(stop)
+        return self.indices[key]
+
+    def scan(self, count):
+        tasks = self.store.tasks
+        while len(self.indices) < count and self.scanned < len(tasks):
+            start, self.scanned = self.scanned, min(self.scanned + FILTER_SCAN_CHUNK, len(tasks))
+            self.indices.extend(compress(range(start, self.scanned), map(self.matches.__contains__, tasks[start:self.scanned])))
+
+class TaskModel:
+    """Task list state and persistence, independent of tkinter.
+
+    Saves go through the given PersistenceWorker, or are written synchronously
+    when there is none (scripts, benchmarks). Every mutation records its inverse
+    in history; undone steps restore the same Task objects at the same index.
+
+    The file may be JSON or a binary snapshot (see snapshot.py); it is written
+    back in the format it was found in. JSON files older than the current
+    schema version are migrated on load (see schema.py) and the MigrationStats
+    kept in migrations.
+
+    Several app instances may share the file. Writes hold a FileLock, whose
+    sequence number tells whether anyone else wrote since base_seq, the last
+    version this instance has fully taken in. If nobody did, the whole list is
+    written as before. Otherwise only this instance's buffered changes (puts and
+    deletes by task id) are merged into what is on disk. check_changes reads
+    other instances' writes off the caller's thread, and apply_changes later
+    adopts their tasks record by record.
+
+    search is a word-prefix index over the task text, kept in step with every
+    edit, which filter() uses to narrow the list as the user types.
+
+    recurring holds the rules of repeating tasks, kept in their own file; their
+    occurrences are expanded per date window and never stored as tasks.
+    """
+
+    def __init__(self, path, persistence=None):
+        self.path = path
+        self.persistence = persistence
+        self.tasks = TaskStore()
+        self.search = TaskTextIndex()
+        self.recurring = RecurrenceBook(rules_path(path), persistence)
+        self.history = History()
+        self.migrations = []
+        # Exception from a failed load_in_background; nothing is saved while it is set
+        self.load_error = None
+        self.base_seq = 0
+        self.mark = 0
+        self.changes = []
+        self.fetched = None
+        self.sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, index):
+        return self.tasks[index]
+
+    def load(self):
+        with FileLock(self.path) as lock:
+            seq = lock.read_seq()
+            # Older files are upgraded in place, ids included, so every instance sees the same ones
+            migration = migrate_file(self.path, TASKS)
+            if migration is not None:
+                self.migrations.append(migration)
+                seq += 1
+                lock.write_seq(seq)
+            if is_snapshot(self.path):
+                self.tasks = TaskStore(read_tasks(self.path))
+            else:
+                self.tasks = TaskStore(map(Task.from_dict, read_records(self.path)))
+        self.search.rebuild(self.tasks)
+        self.recurring.load()
+        with self.sync_lock:
+            self.base_seq = seq
+
+    def load_in_background(self):
+        # Loader thread target. The error is kept for the UI thread, and the file
+        # is left alone rather than overwritten with the tasks of a partial load.
+        try:
+            self.load()
+        except Exception as error:
+            self.load_error = error
+
+    def save(self):
+        # Task objects are turned into dicts while writing, on the worker thread
+        if self.load_error is not None:
+            return
+        data = self.tasks.to_list()
+        with self.sync_lock:
+            base_seq = self.base_seq
+        mark = self.mark
+        job = lambda: self.write_changes(data, base_seq, mark)
+        if self.persistence is not None:
+            self.persistence.submit(self.path, job)
+        else:
+            job()
+
+    def record_change(self, op, value=None):
+        with self.sync_lock:
+            self.mark += 1
+            self.changes.append((self.mark, op, value))
+
+    def write_changes(self, data, base_seq, mark):
+        # Runs on the persistence worker; data is the task list as of change number mark
+        with FileLock(self.path) as lock:
+            seq = lock.read_seq()
+            if seq == base_seq:
+                write_tasks_file(self.path, data)
+                with self.sync_lock:
+                    self.changes = [change for change in self.changes if change[0] > mark]
+                    if self.base_seq == base_seq:
+                        self.base_seq = seq + 1
+            else:
+                with self.sync_lock:
+                    changes, self.changes = self.changes, []
+                if not changes:
+                    return
+                write_tasks_file(self.path, [Task.from_dict(record) for record in merge_changes(read_records(self.path), changes)])
+            lock.write_seq(seq + 1)
+
+    def check_changes(self):
+        # Looks for tasks written by other instances without blocking the caller: the
+        # file is locked and read on the persistence worker, and the next
+        # apply_changes() takes the result in
+        if self.persistence is not None:
+            self.persistence.submit((self.path, "check"), self.fetch_changes)
+        else:
+            self.fetch_changes()
+
+    def fetch_changes(self):
+        # Waits until this instance's own changes have reached the file
+        with self.sync_lock:
+            if self.changes:
+                return
+            base_seq = self.base_seq
+        with FileLock(self.path) as lock:
+            seq = lock.read_seq()
+            if seq == base_seq:
+                return
+            records = read_records(self.path)
+        with self.sync_lock:
+            self.fetched = (base_seq, seq, records)
+
+    def apply_changes(self):
+        # Adopts what fetch_changes read; returns True if any task changed. A read
+        # overtaken by edits or saves of this instance is dropped and fetched again.
+        with self.sync_lock:
+            fetched, self.fetched = self.fetched, None
+            if fetched is None or self.changes or fetched[0] != self.base_seq:
+                return False
+            base_seq, seq, records = fetched
+            changed = self.adopt(records)
+            self.base_seq = seq
+
+        # Undo steps refer to list positions, which the merge may have shifted.
+        # Task text may have changed in place, so the search index is rebuilt.
+        if changed:
+            self.history.clear()
+            self.search.rebuild(self.tasks)
+        return changed
+
+    def reload_changes(self):
+        # check_changes and apply_changes in one blocking call, for scripts
+        self.fetch_changes()
+        return self.apply_changes()
+
+    def adopt(self, records):
+        by_id = {task.id: task for task in self.tasks}
+        added, moved = [], []
+        updated = False
+        for record in records:
+            task = by_id.pop(record.get("id"), None)
+            due_date = record.get("due_date") or ""
+            if task is None:
+                added.append(Task.from_dict(record))
+            elif task.due_date != due_date:
+                moved.append((task, record))
+            elif task.task != record.get("task", "") or task.completed != record.get("completed", False):
+                task.update(record)
+                updated = True
+        removed = list(by_id.values())
+
+        if len(added) + len(moved) + len(removed) > INCREMENTAL_RELOAD_LIMIT:
+            gone = set(by_id)
+            gone.update(task.id for task, record in moved)
+            kept = [task for task in self.tasks if task.id not in gone]
+            for task, record in moved:
+                task.update(record)
+            self.tasks = TaskStore(kept + [task for task, record in moved] + added)
+        else:
+            for task in removed:
+                self.tasks.pop(self.tasks.index_of(task))
+            for task, record in moved:
+                self.tasks.pop(self.tasks.index_of(task))
+                task.update(record)
+                self.tasks.add(task)
+            for task in added:
+                self.tasks.add(task)
+        return bool(added or moved or removed or updated)
+
+    def add_task(self, task_text, due_date):
+        task = new_task(task_text, due_date)
+        index = self.tasks.add(task)
+        self.search.add(task)
+        self.history.record("add task", lambda: self.pop_task(index), lambda: self.insert_task(index, task))
+        self.record_change("put", task.to_dict())
+        self.save()
+        return index
+
+    def delete_task(self, index):
+        task = self.tasks.pop(index)
+        self.search.remove(task)
+        self.history.record("delete task", lambda: self.insert_task(index, task), lambda: self.pop_task(index))
+        self.record_change("delete", task.id)
+        self.save()
+
+    def set_completed(self, index, completed):
+        task = self.tasks[index]
+        previous = task.completed
+        task.completed = completed
+        self.history.record("complete task" if completed else "reopen task",
+                            lambda: self.mark_task(task, previous), lambda: self.mark_task(task, completed))
+        self.record_change("put", task.to_dict())
+        self.save()
+
+    def delete_tasks(self, indices):
+        # A whole selection is one undo step and one save
+        indices = sorted(set(indices))
+        tasks = self.pop_tasks(indices)
+        placed = list(zip(indices, tasks))
+        self.history.record("delete tasks", lambda: self.insert_tasks(placed), lambda: self.pop_tasks(indices))
+
+    def set_completed_many(self, indices, completed):
+        tasks = [self.tasks[index] for index in indices]
+        previous = [task.completed for task in tasks]
+        states = [completed] * len(tasks)
+        self.mark_tasks(tasks, states)
+        self.history.record("complete tasks" if completed else "reopen tasks",
+                            lambda: self.mark_tasks(tasks, previous), lambda: self.mark_tasks(tasks, states))
+
+    def clear(self):
+        # The old store is kept whole by the undo step rather than copied
+        cleared = self.tasks
+        self.tasks = TaskStore()
+        self.search.rebuild(())
+        self.history.record("clear tasks", lambda: self.replace_tasks(cleared), lambda: self.replace_tasks(TaskStore()))
+        self.record_change("clear")
+        self.save()
+
+    def undo(self):
+        # Returns the label of the undone step, or None
+        return self.history.undo()
+
+    def redo(self):
+        return self.history.redo()
+
+    def pop_task(self, index):
+        task = self.tasks.pop(index)
+        self.search.remove(task)
+        self.record_change("delete", task.id)
+        self.save()
+
+    def insert_task(self, index, task):
+        self.tasks.insert(index, task)
+        self.search.add(task)
+        self.record_change("put", task.to_dict())
+        self.save()
+
+    def mark_task(self, task, completed):
+        task.completed = completed
+        self.record_change("put", task.to_dict())
+        self.save()
+
+    def pop_tasks(self, indices):
+        tasks = self.tasks.pop_many(indices)
+        for task in tasks:
+            self.search.remove(task)
+            self.record_change("delete", task.id)
+        self.save()
+        return tasks
+
+    def insert_tasks(self, placed):
+        self.tasks.insert_many(placed)
+        for index, task in placed:
+            self.search.add(task)
+            self.record_change("put", task.to_dict())
+        self.save()
+
+    def mark_tasks(self, tasks, states):
+        for task, completed in zip(tasks, states):
+            task.completed = completed
+            self.record_change("put", task.to_dict())
+        self.save()
+
+    def replace_tasks(self, tasks):
+        self.tasks = tasks
+        self.search.rebuild(tasks)
+        self.record_change("clear")
+        for task in tasks:
+            self.record_change("put", task.to_dict())
+        self.save()
+
+    def filter(self, query):
+        # Store indices of the tasks matching query, in list order (a list or a
+        # FilteredTasks); None when the query is empty and the whole list shows
+        matches = self.search.matches(query)
+        if matches is None:
+            return None
+        if len(matches) * 64 < len(self.tasks):
+            return self.indices_of(matches)
+        return FilteredTasks(self.tasks, matches)
+
+    def indices_of(self, tasks):
+        # Sorted store indices of a set of tasks
+        if len(tasks) * 64 < len(self.tasks):
+            # Few tasks: find each by bisecting its due-date group
+            return sorted(self.tasks.index_of(task) for task in tasks)
+        return list(compress(range(len(self.tasks)), map(tasks.__contains__, self.tasks)))
+
+    def rows(self, start=0, stop=None, formatter=task_row):
+        return [formatter(task_data) for task_data in self.tasks[start:stop]]
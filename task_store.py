@@ -0,0 +1,171 @@
+import secrets
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import compress
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Sort key for tasks whose due date is missing or not in DATE_FORMAT; they go last
+UNDATED_KEY = date.max.toordinal() + 1
+
+def new_task_id():
+    return secrets.randbits(63)
+
+class Task:
+    """One task. Stored on disk as {"id", "task", "due_date", "completed", "text_color"}.
+
+    text_color is derived from completed rather than stored, and due dates are
+    interned since many tasks share a date. The random id identifies a task
+    when changes from several app instances are merged.
+    """
+
+    __slots__ = ("id", "task", "due_date", "completed")
+
+    def __init__(self, task, due_date, completed=False, id=None):
+        self.id = id if id is not None else new_task_id()
+        self.task = task
+        self.due_date = sys.intern(due_date)
+        self.completed = completed
+
+    @property
+    def text_color(self):
+        return "gray" if self.completed else "black"
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("task", ""), data.get("due_date") or "", data.get("completed", False), data.get("id"))
+
+    def update(self, data):
+        # Takes the fields of a dict read from disk; the id is kept
+        self.task = data.get("task", "")
+        self.due_date = sys.intern(data.get("due_date") or "")
+        self.completed = data.get("completed", False)
+
+    def to_dict(self):
+        return {"id": self.id, "task": self.task, "due_date": self.due_date, "completed": self.completed,
+                "text_color": self.text_color}
+
+def task_to_json(task):
+    # json.dump default= hook, so task lists serialize without building dicts up front
+    if isinstance(task, Task):
+        return task.to_dict()
+    raise TypeError(f"Object of type {type(task).__name__} is not JSON serializable")
+
+def parse_due_date(text):
+    try:
+        return datetime.strptime(text, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+@lru_cache(maxsize=4096)
+def due_date_text_key(text):
+    due_date = parse_due_date(text)
+    return due_date.toordinal() if due_date else UNDATED_KEY
+
+def due_date_key(task):
+    return due_date_text_key(task.due_date)
+
+class TaskStore:
+    """Tasks kept ordered by parsed due date.
+
+    A parallel array of date ordinals is maintained next to the tasks, so inserts
+    find their slot with bisect instead of re-sorting, and date range queries are
+    two binary searches. Tasks sharing a due date keep their insertion order.
+    """
+
+    def __init__(self, tasks=()):
+        self.tasks = sorted(tasks, key=due_date_key)
+        self.keys = array("q", map(due_date_key, self.tasks))
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    def __getitem__(self, index):
+        return self.tasks[index]
+
+    def __delitem__(self, index):
+        del self.tasks[index]
+        del self.keys[index]
+
+    def add(self, task):
+        key = due_date_key(task)
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.tasks.insert(index, task)
+        return index
+
+    def insert(self, index, task):
+        # Puts a task back where it was removed from (undo); order is not checked
+        self.keys.insert(index, due_date_key(task))
+        self.tasks.insert(index, task)
+
+    def pop(self, index):
+        del self.keys[index]
+        return self.tasks.pop(index)
+
+    def pop_many(self, indices):
+        # Removes the tasks at the given ascending indices in one pass
+        popped = [self.tasks[index] for index in indices]
+        keep = bytearray(b"\x01") * len(self.tasks)
+        for index in indices:
+            keep[index] = 0
+        self.tasks = list(compress(self.tasks, keep))
+        self.keys = array("q", compress(self.keys, keep))
+        return popped
+
+    def insert_many(self, placed):
+        # Puts (index, task) pairs, ascending by index, back where pop_many took them from
+        tasks, keys = [], array("q")
+        position = 0
+        for index, task in placed:
+            count = index - len(tasks)
+            tasks.extend(self.tasks[position:position + count])
+            keys.extend(self.keys[position:position + count])
+            position += count
+            tasks.append(task)
+            keys.append(due_date_key(task))
+        tasks.extend(self.tasks[position:])
+        keys.extend(self.keys[position:])
+        self.tasks, self.keys = tasks, keys
+
+    def index_of(self, task):
+        # Tasks sharing a due date are scanned; the rest is a binary search
+        key = due_date_key(task)
+        for index in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+            if self.tasks[index] is task:
+                return index
+        raise ValueError("task is not in the store")
+
+    def clear(self):
+        self.tasks = []
+        self.keys = array("q")
+
+    def to_list(self):
+        return list(self.tasks)
+
+    def index_range(self, start=None, end=None):
+        # Indices of tasks due on or after start and on or before end (both dates)
+        low = bisect_left(self.keys, start.toordinal()) if start else 0
+        high = bisect_right(self.keys, end.toordinal()) if end else bisect_left(self.keys, UNDATED_KEY)
+        return range(low, max(low, high))
+
+    def due_between(self, start, end):
+        return [self.tasks[index] for index in self.index_range(start, end)]
+
+    def overdue(self, today=None, include_completed=False):
+        today = today or date.today()
+        tasks = self.due_between(None, today - timedelta(days=1))
+        if include_completed:
+            return tasks
+        return [task for task in tasks if not task.completed]
+
+    def due_this_week(self, today=None):
+        today = today or date.today()
+        week_start = today - timedelta(days=today.weekday())
+        return self.due_between(week_start, week_start + timedelta(days=6))